@@ -0,0 +1,62 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Compare lookup table classification with the former if-chains.
+
+Usage: python benchmarks/classify.py [HOURS]
+"""
+
+import random
+import sys
+import timeit
+from weathercat.output import classify_wind, classify_ww
+
+def represent_ww_reference(code):  # pylint: disable=too-many-return-statements
+    """Symbolize and colorize WMO Weather interpretation codes (WW)."""
+    if code in (0,):
+        return "☀️ ", "clear"
+    if code in (1, 2):
+        return "🌤️ ", "partly_cloudy"
+    if code in (3,):
+        return "☁️ ", "overcast"
+    if code in (45, 48):
+        return "🌫️ ", "fog"
+    if code in (51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82):
+        return "🌧️ ", "rain"
+    if code in (71, 73, 75, 77, 85, 86):
+        return "❄️ ", "snow"
+    if code in (95, 96, 99):
+        return "⚡", "thunderstorm"
+    raise ValueError(f"Unsupported WMO Weather interpretation code: {code}")
+
+def represent_wind_reference(speed):
+    """Symbolize wind speeds."""
+    if speed < 3.5:
+        return " "
+    if speed < 7.5:
+        return "⣀"
+    if speed < 13.5:
+        return "⣤"
+    if speed < 20.5:
+        return "⣶"
+    return "⣿"
+
+def main():
+    """Execute."""
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 16*24*100
+    random.seed(0)
+    codes = [random.choice([0, 1, 2, 3, 45, 61, 71, 95]) for _ in range(hours)]
+    speeds = [random.uniform(0, 25) for _ in range(hours)]
+    assert classify_ww(codes) == [represent_ww_reference(x) for x in codes]
+    assert classify_wind(speeds) == "".join(represent_wind_reference(x)
+                                            for x in speeds)
+    for name, function in [
+            ("reference", lambda: ([represent_ww_reference(x) for x in codes],
+                                   "".join(represent_wind_reference(x)
+                                           for x in speeds))),
+            ("tables", lambda: (classify_ww(codes), classify_wind(speeds)))]:
+        seconds = min(timeit.repeat(function, number=1, repeat=5))
+        print(f"{name:<10} {hours} hours: {seconds*1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
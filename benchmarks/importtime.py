@@ -0,0 +1,61 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Report the import time breakdown of weathercat startup paths.
+
+Usage: python benchmarks/importtime.py [--top N]
+
+Exits with status 1 if a startup path imports a module it shouldn't.
+"""
+
+import argparse
+import subprocess
+import sys
+
+# code run in a fresh interpreter for each startup path
+SCENARIOS = {
+    "import": "import weathercat.script",
+    "parse": "import weathercat.script\n"
+             "from weathercat.config import parse_arguments, setup_logging\n"
+             "setup_logging(parse_arguments(['61.0', '24.5']).loglevel)",
+}
+
+# modules that no startup path may import before real work starts
+HEAVY_MODULES = ["rich", "requests", "geopy", "geocoder", "gi", "skyfield",
+                 "multiprocessing", "importlib.metadata"]
+
+def measure(code):
+    """Return (module, self μs, cumulative μs) tuples for running code."""
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                             capture_output=True, text=True, check=True)
+    rows = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def main():
+    """Execute."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15,
+                        help="number of slowest modules to list")
+    args = parser.parse_args()
+    failed = False
+    for name, code in SCENARIOS.items():
+        rows = measure(code)
+        modules = {module for module, _self_us, _cumulative_us in rows}
+        total = sum(self_us for _module, self_us, _cumulative_us in rows)
+        print(f"{name}: {len(rows)} modules, {total/1000:.1f} ms")
+        for module, self_us, cumulative_us in sorted(
+                rows, key=lambda row: row[2], reverse=True)[:args.top]:
+            print(f"  {cumulative_us/1000:8.1f} ms {self_us/1000:8.1f} ms  "
+                  f"{module}")
+        if unwanted := [x for x in HEAVY_MODULES if x in modules]:
+            print(f"  unwanted imports: {', '.join(unwanted)}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Compare lunar phase methods by wall-clock time and peak RSS.
+
+Usage: python benchmarks/moon.py [YEAR]
+
+Each method checks seven consecutive days in a fresh interpreter.
+"""
+
+import subprocess
+import sys
+
+METHODS = {
+    "table": "full_moon_between",
+    "skyfield": "lambda dt0, dt1: bool(compute_full_moons(dt0, dt1, "
+                "load_ephemeris()))",
+    "approximation": "lambda dt0, dt1: bool(approximate_full_moons(dt0, dt1))",
+}
+
+CODE = """\
+import resource, time
+start = time.perf_counter()
+from datetime import datetime, timedelta, timezone
+from weathercat.output.moon import *
+method = {method}
+day = datetime({year}, 8, 1, tzinfo=timezone.utc)
+days = [day + timedelta(days=x) for x in range(7)]
+result = [method(x, x + timedelta(days=1)) for x in days]
+print(f"{{time.perf_counter() - start:.3f}}",
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, sum(result))
+"""
+
+def main():
+    """Execute."""
+    year = int(sys.argv[1]) if len(sys.argv) > 1 else 2023
+    print(f"{'method':<15}{'time [s]':>10}{'peak RSS [MiB]':>16}"
+          f"{'full moons':>12}")
+    for name, method in METHODS.items():
+        process = subprocess.run(
+            [sys.executable, "-c", CODE.format(method=method, year=year)],
+            capture_output=True, text=True, check=True)
+        seconds, max_rss, count = process.stdout.split()
+        print(f"{name:<15}{seconds:>10}{int(max_rss)/1024:>16.1f}{count:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Time the forecast pipeline stage by stage against the local stand-in.
+
+Usage: python benchmarks/pipeline.py [--days N ...] [--locations N ...]
+                                     [--repeat N] [--output FILE]
+                                     [--compare FILE [--threshold RATIO]]
+
+Stages are timed separately with cold and warm caches, and those depending
+on the horizon or the number of locations over each combination of --days
+and --locations. Forecasts are served by weathercat.providers.standin, or
+read from tests/forecast.txt by the file provider. Geocoding is timed from
+the cache only, as a cold reverse lookup is a miss in offline mode. Caches
+and configuration live in a temporary directory.
+
+Results are written as JSON, and a summary is printed to stderr. With
+--compare, minimum times are compared with an earlier result file, and the
+exit status is 1 if a stage got slower than the threshold ratio.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+FIXTURE = pathlib.Path(__file__).parent.parent / "tests" / "forecast.txt"
+
+TERMINAL = {"width": 100, "is_terminal": True, "color_system": "truecolor"}
+
+def measure(function, setup=None, repeat=5):
+    """Return the minimum and median wall-clock times of function in ms."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start)*1000)
+    return {"min_ms": round(min(times), 3),
+            "median_ms": round(statistics.median(times), 3)}
+
+def fresh_interpreter(code):
+    """Return the time of running code in a fresh interpreter in ms."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return (time.perf_counter() - start)*1000
+
+def bench_startup(repeat):
+    """Time imports and configuration parsing."""
+    # pylint: disable=import-outside-toplevel
+    from weathercat.config import parse_config_file
+    config_file = pathlib.Path(os.environ["XDG_CONFIG_HOME"], "weathercat",
+                               "weathercat.conf")
+    for variant, code in [("python", "pass"),
+                          ("script", "import weathercat.script"),
+                          ("output", "import weathercat.output")]:
+        times = [fresh_interpreter(code) for _ in range(repeat)]
+        yield "import", variant, {"min_ms": round(min(times), 3),
+                                  "median_ms": round(statistics.median(times),
+                                                     3)}
+    yield "config", "cold", measure(parse_config_file,
+                                    lambda: config_file.unlink(missing_ok=True),
+                                    repeat)
+    yield "config", "warm", measure(parse_config_file, repeat=repeat)
+
+def bench_geocoding(coordinates, repeat):
+    """Time reverse geocoding of coordinates from the cache."""
+    # pylint: disable=import-outside-toplevel
+    import locale
+    import shutil
+    from weathercat.cache import FileCache
+    from weathercat.geolocation import georesolve
+    cache = FileCache("geocoding", max_entries=len(coordinates))
+    language = (locale.getlocale()[0] or "en").replace("_", "-")
+    queries = [f"{ϕ}, {λ}" for ϕ, λ in coordinates]
+    def resolve():
+        for query in queries:
+            georesolve(query, offline=True, max_entries=len(coordinates))
+    yield "geocoding", "cold", measure(
+        resolve, lambda: shutil.rmtree(cache.directory, ignore_errors=True),
+        repeat)
+    for ϕ, λ in coordinates:
+        cache.set(["reverse", round(ϕ, 2), round(λ, 2), language], "Hölmölä")
+    yield "geocoding", "warm", measure(resolve, repeat=repeat)
+
+def bench_fetch(coordinates, options, repeat):
+    """Time fetching forecasts with cold and warm caches."""
+    # pylint: disable=import-outside-toplevel
+    import shutil
+    from weathercat.cache import FileCache
+    from weathercat.providers import get_forecasts, open_meteo
+    forecast_cache = FileCache("forecasts")
+    def clear_cache():
+        open_meteo.loaded.clear()
+        shutil.rmtree(forecast_cache.directory, ignore_errors=True)
+    def fetch():
+        return get_forecasts(coordinates, **options)
+    yield "fetch", "cold", measure(fetch, clear_cache, repeat)
+    yield "fetch", "disk", measure(fetch, open_meteo.loaded.clear, repeat)
+    yield "fetch", "memory", measure(fetch, repeat=repeat)
+    yield "fetch", "file", measure(
+        lambda: get_forecasts(coordinates, "file", path=str(FIXTURE),
+                              days=options["days"]), repeat=repeat)
+
+def bench_transform(coordinates, days, base_url, repeat):
+    """Time transforming responses and looking up full moons."""
+    # pylint: disable=import-outside-toplevel
+    from weathercat.output import full_moon_between, load_full_moons
+    from weathercat.providers import open_meteo
+    payloads = [open_meteo.build_payload(ϕ, λ, days) for ϕ, λ in coordinates]
+    responses = [item for i in range(0, len(payloads), open_meteo.BULK_SIZE)
+                 for item in open_meteo.request_forecasts(
+                     payloads[i:i + open_meteo.BULK_SIZE], base_url)]
+    yield "transform", "warm", measure(
+        lambda: [open_meteo.transform(x) for x in responses], repeat=repeat)
+
+    zone = ZoneInfo(responses[0]["timezone"])
+    start = datetime.combine(datetime.now(zone).date(), datetime.min.time(),
+                             tzinfo=zone)
+    def moon():
+        for _coordinates in coordinates:
+            for day in range(days):
+                full_moon_between(start + timedelta(days=day),
+                                  start + timedelta(days=day + 1))
+    yield "moon", "cold", measure(moon, load_full_moons.cache_clear, repeat)
+    yield "moon", "warm", measure(moon, repeat=repeat)
+
+def bench_output(forecasts, repeat):
+    """Time rendering forecasts, and reading renderings from cache."""
+    # pylint: disable=import-outside-toplevel
+    from weathercat.cache import FileCache, end_of_hour, render_key
+    from weathercat.output import render
+    def output():
+        for forecast in forecasts:
+            render(forecast, "Hölmölä, Suomi", TERMINAL)
+    yield "output", "render", measure(output, repeat=repeat)
+    renders = FileCache("renders", max_entries=len(forecasts))
+    for forecast in forecasts:
+        renders.set(render_key(forecast, "Hölmölä, Suomi", TERMINAL),
+                    render(forecast, "Hölmölä, Suomi", TERMINAL),
+                    expires=end_of_hour())
+    yield "output", "cached", measure(
+        lambda: [renders.get(render_key(x, "Hölmölä, Suomi", TERMINAL))
+                 for x in forecasts], repeat=repeat)
+
+def bench_forecasts(coordinates, days, base_url, repeat):
+    """Time fetching, transforming and rendering forecasts."""
+    # pylint: disable=import-outside-toplevel
+    from weathercat.providers import get_forecasts
+    options = {"days": days, "base_url": base_url,
+               "max_entries": len(coordinates)}
+    yield from bench_fetch(coordinates, options, repeat)
+    yield from bench_transform(coordinates, days, base_url, repeat)
+    yield from bench_output(get_forecasts(coordinates, **options), repeat)
+
+def compare(results, baseline, threshold):
+    """Print time ratios to baseline results and return the regressions."""
+    def key(result):
+        return (result["stage"], result["variant"], result["days"],
+                result["locations"])
+    previous = {key(x): x for x in baseline["results"]}
+    regressions = []
+    for result in results:
+        if not (before := previous.get(key(result))):
+            continue
+        ratio = result["min_ms"]/max(before["min_ms"], 0.001)
+        if ratio > threshold:
+            regressions.append(result)
+        print(f"{' '.join(str(x or '') for x in key(result)):<26}"
+              f" {before['min_ms']:10.2f} → {result['min_ms']:10.2f} ms"
+              f" {ratio:6.2f}×{' !' if ratio > threshold else ''}",
+              file=sys.stderr)
+    return regressions
+
+def main():
+    """Execute."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7, 16])
+    parser.add_argument("--locations", type=int, nargs="+",
+                        default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=argparse.FileType("w"),
+                        default=sys.stdout, help="JSON output file")
+    parser.add_argument("--compare", type=argparse.FileType("r"),
+                        metavar="FILE", help="earlier JSON output")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+    for name in ["XDG_CACHE_HOME", "XDG_CONFIG_HOME", "XDG_DATA_HOME"]:
+        os.environ[name] = os.path.join(directory.name, name)
+    # pylint: disable=import-outside-toplevel
+    from weathercat.providers.standin import start
+    server = start()
+    results = []
+    def record(stage, variant, timing, days=None, locations=None):
+        results.append({"stage": stage, "variant": variant, "days": days,
+                        "locations": locations, **timing})
+        print(f"{stage:<10} {variant:<7} {days or '':>4} {locations or '':>4}"
+              f" {timing['min_ms']:10.2f} ms", file=sys.stderr)
+
+    for stage, variant, timing in bench_startup(args.repeat):
+        record(stage, variant, timing)
+    for locations in args.locations:
+        coordinates = [(60 + i*0.1, 24 + i*0.1) for i in range(locations)]
+        for stage, variant, timing in bench_geocoding(coordinates,
+                                                      args.repeat):
+            record(stage, variant, timing, locations=locations)
+        for days in args.days:
+            for stage, variant, timing in bench_forecasts(
+                    coordinates, days, server.base_url, args.repeat):
+                record(stage, variant, timing, days, locations)
+    server.shutdown()
+    directory.cleanup()
+
+    json.dump({"python": platform.python_version(),
+               "platform": platform.platform(),
+               "repeat": args.repeat,
+               "results": results}, args.output, indent=1)
+    args.output.write("\n")
+    if args.compare and compare(results, json.load(args.compare),
+                                args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Compare rendering from styled text with rendering from console markup.
+
+Usage: python benchmarks/render.py [WIDTH]
+"""
+
+import ast
+import pathlib
+import sys
+import timeit
+from weathercat.output import render
+from weathercat.providers import Forecast
+from weathercat.providers.open_meteo import transform
+
+FORECAST = pathlib.Path(__file__).parent.parent / "tests" / "forecast.txt"
+
+def main():
+    """Execute."""
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    forecast = Forecast(transform(ast.literal_eval(
+        FORECAST.read_text(encoding="utf8"))))
+    terminal = {"width": width, "is_terminal": True,
+                "color_system": "truecolor"}
+    renders = {backend: render(forecast, "Hölmölä, Suomi", terminal,
+                               {"backend": backend})
+               for backend in ["markup", "text"]}
+    assert renders["markup"] == renders["text"]
+    for backend in renders:
+        seconds = min(timeit.repeat(
+            lambda b=backend: render(forecast, "Hölmölä, Suomi", terminal,
+                                     {"backend": b}),
+            number=10, repeat=5))/10
+        print(f"{backend:<7} width {width}: {seconds*1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
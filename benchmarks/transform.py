@@ -0,0 +1,69 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Compare open_meteo.transform with the former deepcopy implementation.
+
+Usage: python benchmarks/transform.py [DAYS LOCATIONS]
+"""
+
+import random
+import sys
+import timeit
+from copy import deepcopy
+from statistics import mean
+from weathercat.providers.open_meteo import transform
+
+def transform_reference(data):
+    """Replace daily conditions 0-3 with average hourly condition."""
+    result = deepcopy(data)
+    for day, code in enumerate(data["daily"]["weathercode"]):
+        if code > 3:
+            continue
+        avg = round(mean(data["hourly"]["weathercode"][day*24:(day + 1)*24]))
+        result["daily"]["weathercode"][day] = avg
+    return result
+
+def synthesize(days):
+    """Synthesize an Open-Meteo response."""
+    codes = [0, 1, 2, 3, 45, 61, 71, 95]
+    hours = days*24
+    return {
+        "latitude": 61.0, "longitude": 24.5, "timezone": "Europe/Helsinki",
+        "current_weather": {"temperature": 18.0, "windspeed": 1.5,
+                            "weathercode": 2, "time": "2023-07-08T19:00"},
+        "hourly": {
+            "time": [f"T{i}" for i in range(hours)],
+            "temperature_2m": [random.uniform(-30, 30) for _ in range(hours)],
+            "apparent_temperature": [random.uniform(-30, 30)
+                                     for _ in range(hours)],
+            "weathercode": [random.choice(codes) for _ in range(hours)],
+            "windspeed_10m": [random.uniform(0, 25) for _ in range(hours)],
+        },
+        "daily": {
+            "time": [f"D{i}" for i in range(days)],
+            "weathercode": [random.choice(codes) for _ in range(days)],
+            **{name: [random.uniform(-30, 30) for _ in range(days)]
+               for name in ["temperature_2m_max", "temperature_2m_min",
+                            "apparent_temperature_max",
+                            "apparent_temperature_min", "uv_index_max",
+                            "uv_index_clear_sky_max"]},
+        },
+    }
+
+def main():
+    """Execute."""
+    days, locations = map(int, sys.argv[1:3]) if len(sys.argv) > 2 else (16,
+                                                                         100)
+    random.seed(0)
+    payload = [synthesize(days) for _ in range(locations)]
+    assert [transform(x) for x in payload] == [transform_reference(x)
+                                               for x in payload]
+    for name, function in [("reference", transform_reference),
+                           ("transform", transform)]:
+        seconds = min(timeit.repeat(lambda f=function: [f(x) for x in payload],
+                                    number=1, repeat=5))
+        print(f"{name:<10} {days} days × {locations} locations: "
+              f"{seconds*1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
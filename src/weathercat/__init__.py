@@ -1,5 +1,5 @@
 """Package initializer module."""
 
-# read version from installed package
-from importlib.metadata import version
-__version__ = version("weathercat")
+# a literal rather than installed package metadata, as importlib.metadata is
+# slow to import; pyproject.toml reads the version from here
+__version__ = "0.6"
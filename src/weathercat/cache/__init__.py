@@ -0,0 +1,4 @@
+"""Convenience imports."""
+
+from .cache import *
+from .rendering import *
@@ -0,0 +1,145 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Persistent cache."""
+
+import contextlib
+import hashlib
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+import platformdirs
+from weathercat.profiling import count
+
+try:
+    import fcntl
+except ImportError:  # not on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait for another process to fill an entry, and between attempts
+# to take its lock
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.02
+
+def acquire(file_object, timeout: float) -> bool:
+    """Take an exclusive lock on an open file within timeout seconds."""
+    if not fcntl:
+        return False
+    deadline = time.monotonic() + timeout
+    for attempt in itertools.count():
+        try:
+            fcntl.flock(file_object, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timeout waiting for {file_object.name}")
+                return False
+            if not attempt:
+                count("lock.waits")
+            time.sleep(LOCK_POLL_INTERVAL)
+    return False
+
+class FileCache:
+    """JSON entries in a user cache subdirectory, one file per key.
+
+    Writes go through a temporary file and an atomic rename, so concurrent
+    processes never see partial entries. The least recently used entries
+    are evicted when the cache grows beyond max_entries.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 64):
+        self.namespace = namespace
+        self.max_entries = max_entries
+
+    @property
+    def directory(self):
+        """Return the cache directory."""
+        return platformdirs.user_cache_path("weathercat") / self.namespace
+
+    def path(self, key):
+        """Return the file path of a JSON-serializable key."""
+        serialized = json.dumps(key, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha1(serialized.encode("utf8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def get(self, key, stale=False):
+        """Return a cached value, or None if missing or expired."""
+        entry = self.get_entry(key, stale)
+        return entry["value"] if entry else None
+
+    def get_entry(self, key, stale=False):
+        """Return a cached entry with value and expiry timestamp, or None."""
+        path = self.path(key)
+        try:
+            with open(path, encoding="utf8") as file_object:
+                entry = json.load(file_object)
+        except (OSError, ValueError):
+            count(f"cache.{self.namespace}.miss")
+            return None
+        if (not stale and entry["expires"] is not None
+                and entry["expires"] <= time.time()):
+            logger.debug(f"Expired {path}")
+            count(f"cache.{self.namespace}.expired")
+            return None
+        count(f"cache.{self.namespace}.hit")
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        logger.debug(f"Read {path}")
+        return entry
+
+    def set(self, key, value, expires=None):
+        """Store a value atomically, with an optional expiry timestamp."""
+        path = self.path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(mode="w", encoding="utf8",
+                                             dir=self.directory,
+                                             suffix=".tmp",
+                                             delete=False) as file_object:
+                json.dump({"expires": expires, "value": value}, file_object,
+                          ensure_ascii=False)
+            os.replace(file_object.name, path)
+        except OSError as error:  # handle read-only file system etc.
+            logger.warning(error)
+            return
+        logger.debug(f"Wrote {path}")
+        self.evict()
+
+    @contextlib.contextmanager
+    def lock(self, key, timeout: float = LOCK_TIMEOUT):
+        """Hold an exclusive lock on a key across processes and threads.
+
+        Yields whether the lock was taken. Callers that don't get it within
+        timeout seconds proceed unlocked rather than wait on a stuck holder.
+        """
+        path = self.path(key).with_suffix(".lock")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            file_object = open(path, "a", encoding="utf8")
+        except OSError as error:  # handle read-only file system etc.
+            logger.warning(error)
+            yield False
+            return
+        with file_object:  # closing releases the lock
+            yield acquire(file_object, timeout)
+
+    def evict(self):
+        """Remove the least recently used entries beyond max_entries."""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:  # removed by another process
+                continue
+        entries.sort(reverse=True)
+        for _mtime, path in entries[self.max_entries:]:
+            logger.debug(f"Evicting {path}")
+            path.unlink(missing_ok=True)
+            path.with_suffix(".lock").unlink(missing_ok=True)
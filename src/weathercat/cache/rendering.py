@@ -0,0 +1,36 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Pre-rendered output cache."""
+
+import locale
+import time
+from datetime import datetime
+from pathlib import Path
+from weathercat import __version__
+
+# files that renderings depend on, relative to the package
+RENDERER_FILES = ["output/output.py", "output/moon.py", "output/full_moons.txt",
+                  "formats/symbols.py", "formats/formats.py"]
+
+def render_key(forecast, toponym: str, terminal: dict,
+               resolution: str = "daily") -> list:
+    """Return the cache key of a rendered forecast.
+
+    The rendering depends on the forecast, its resolution, the terminal,
+    the locale and the current hour, and on the renderer itself, which is
+    identified by the package version and the modification times of its
+    files.
+    """
+    package = Path(__file__).parent.parent
+    return [forecast.digest, resolution, toponym, terminal["width"],
+            terminal["is_terminal"], terminal["color_system"],
+            terminal.get("no_color", False),
+            locale.setlocale(locale.LC_ALL),
+            datetime.now().strftime("%Y-%m-%dT%H"), __version__,
+            *[(package / x).stat().st_mtime_ns for x in RENDERER_FILES]]
+
+def end_of_hour() -> float:
+    """Return the Unix time of the next full hour."""
+    now = time.time()
+    return now - now % 3600 + 3600
@@ -0,0 +1,62 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Thin client for the weathercat daemon.
+
+Only the standard library and platformdirs are imported, so that a query
+answered by a running daemon takes a few milliseconds. Without a daemon,
+the full command-line interface is run instead.
+"""
+
+import json
+import socket
+import sys
+from weathercat.protocol import socket_path
+from weathercat.terminal import describe_terminal
+
+# seconds to wait for the daemon's answer
+TIMEOUT = 15
+
+# options that act on this process or its terminal, so the full interface
+# runs them instead of the daemon
+LOCAL_OPTIONS = {"-h", "--help", "--daemon", "-w", "--watch", "--profile",
+                 "--timings", "--profile-render"}
+
+def query(argv, file=None):
+    """Send arguments to the daemon and return (status, output).
+
+    The output is also written to file as it arrives, if given. Raise
+    ConnectionError if the daemon hangs up before the status.
+    """
+    request = {"argv": argv, **describe_terminal()}
+    if {"-", "--batch=-"} & set(argv):
+        request["stdin"] = sys.stdin.read()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(TIMEOUT)
+        connection.connect(str(socket_path()))
+        connection.sendall(json.dumps(request).encode("utf8") + b"\n")
+        connection.shutdown(socket.SHUT_WR)
+        chunks = []
+        with connection.makefile("rb") as lines:
+            for line in lines:
+                message = json.loads(line)
+                if "status" in message:
+                    return message["status"], "".join(chunks)
+                chunks.append(message["output"])
+                if file:
+                    file.write(message["output"])
+                    file.flush()
+    raise ConnectionError("The daemon hung up")
+
+def main():
+    """Execute."""
+    argv = sys.argv[1:]
+    if not LOCAL_OPTIONS & {x.split("=")[0] for x in argv}:
+        try:
+            status, _output = query(argv, sys.stdout)
+        except OSError:  # no daemon
+            pass
+        else:
+            sys.exit(status)
+    from weathercat.script import main as script_main  # pylint: disable=import-outside-toplevel
+    script_main()
@@ -6,14 +6,15 @@
 import argparse
 import logging
 import sys
-from importlib.metadata import metadata
-from rich import box
-from rich.console import Console
-from rich.table import Table
-from weathercat.output import custom_theme
 
 def print_epilog():
     """Print additional help."""
+    # pylint: disable=import-outside-toplevel
+    from rich import box
+    from rich.console import Console
+    from rich.table import Table
+    from weathercat.output import custom_theme
+
     conditions = Table.grid(padding=(0, 1))
     conditions.add_column()
     conditions.add_column()
@@ -51,12 +52,24 @@ def print_epilog():
     console = Console(theme=custom_theme)
     console.print(outer_table)
 
-def parse_arguments(argv=None):
-    """Parse command-line arguments."""
-    parser = argparse.ArgumentParser(
-        description=metadata("weathercat")["Summary"],
-        add_help=False,
-    )
+class UsageError(ValueError):
+    """Invalid command-line arguments, with the usage message."""
+
+class RaisingArgumentParser(argparse.ArgumentParser):
+    """Argument parser that raises UsageError instead of exiting."""
+
+    def error(self, message):
+        raise UsageError(f"{self.format_usage()}{self.prog}: error: "
+                         f"{message}\n")
+
+def parse_arguments(argv=None, exit_on_error=True):
+    """Parse command-line arguments.
+
+    Invalid arguments print usage and exit, or raise UsageError unless
+    exit_on_error is set.
+    """
+    parser = (argparse.ArgumentParser if exit_on_error
+              else RaisingArgumentParser)(add_help=False)
     parser.add_argument(
         "-h", "--help",
         action="store_true",
@@ -75,6 +88,78 @@ def parse_arguments(argv=None):
         action="store_true",
         help="force location autodetection",
     )
+    parser.add_argument(
+        "-o", "--offline",
+        action="store_true",
+        help="resolve locations only from caches and the gazetteer",
+    )
+    parser.add_argument(
+        "-b", "--batch",
+        nargs="?",
+        const="",
+        metavar="FILE",
+        help="forecast locations listed one per line in FILE (- for stdin) "
+             "or in batch_locations of the configuration file",
+    )
+    parser.add_argument(
+        "-s", "--summary",
+        action="store_true",
+        help="output one line per location in batch mode",
+    )
+    parser.add_argument(
+        "-n", "--days",
+        type=int,
+        choices=range(1, 17),
+        default=7,
+        metavar="{1..16}",
+        help="forecast horizon in days (default: 7)",
+    )
+    parser.add_argument(
+        "-r", "--resolution",
+        choices=["daily", "hourly", "15min"],
+        default="daily",
+        help="list hourly or 15-minutely conditions instead of days",
+    )
+    parser.add_argument(
+        "-f", "--format",
+        choices=["rich", "json", "line", "template"],
+        default="rich",
+        help="output format (default: rich)",
+    )
+    parser.add_argument(
+        "--fields",
+        type=lambda fields: fields.split(","),
+        metavar="FIELD,...",
+        help="comma-separated fields of json and line output",
+    )
+    parser.add_argument(
+        "--template",
+        help='format string over fields, e.g. "{symbol} {temperature:.0f}°C"'
+             " (implies --format template)",
+    )
+    parser.add_argument(
+        "-w", "--watch",
+        action="store_true",
+        help="keep the forecast on the screen up to date",
+    )
+    parser.add_argument(
+        "--profile", "--timings",
+        nargs="?",
+        const="text",
+        choices=["text", "json"],
+        help="print a breakdown of stage timings, HTTP transfers and cache "
+             "hits to stderr",
+    )
+    parser.add_argument(
+        "--profile-render",
+        metavar="FILE",
+        help="write cProfile statistics of rendering to FILE",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="serve forecasts to weathercat-client over a Unix domain socket",
+    )
     parser.add_argument(
         "location",
         metavar="LOCATION",
@@ -83,10 +168,18 @@ def parse_arguments(argv=None):
     )
     args, unknown_args = parser.parse_known_args(argv)
     if args.help:
+        from importlib.metadata import metadata  # pylint: disable=import-outside-toplevel
+        parser.description = metadata("weathercat")["Summary"]
         parser.print_help()
         print()
         print_epilog()
         sys.exit()
     if unknown_args:
         args.location = unknown_args + args.location
+    if args.template and args.format == "rich":
+        args.format = "template"
+    if args.format == "template" and not args.template:
+        parser.error("--format template requires --template")
+    if args.watch and (args.batch is not None or args.format != "rich"):
+        parser.error("--watch supports a single location in rich format")
     return args
@@ -21,7 +21,21 @@ def parse_config_file() -> dict:
                 '# default_location.latitude = 61.000689\n'
                 '# default_location.longitude = 24.479063\n'
                 '# default_location.name = "Hämeenlinna"\n'
-                '# locale = "fi_FI.UTF-8"\n')
+                '# locale = "fi_FI.UTF-8"\n'
+                '# batch_locations = ["Helsinki", "61.5, 23.8"]\n'
+                '# forecast_cache.ttl = 3600  # seconds, 0 disables caching\n'
+                '# forecast_cache.max_entries = 64\n'
+                '# forecast_cache.current_ttl = 900  # seconds, 0 disables\n'
+                '# geocoding_cache.max_entries = 256\n'
+                '# geocoding_cache.offline = false\n'
+                '# geocoding_cache.gazetteer = "fallback"  # or prefer, off\n'
+                '# geolocation.max_age = 3600  # seconds to reuse a fix\n'
+                '# geolocation.max_accuracy = 10000  # meters\n'
+                '# provider.name = "open-meteo"  # or "file"\n'
+                '# provider.mirrors = ["http://localhost:8080/v1/forecast"]\n'
+                '# provider.path = "forecast.json"  # for the file provider\n'
+                '# history.enabled = false  # record fetched forecasts\n'
+                '# history.path = "/path/to/history"\n')
         except OSError as error:  # handle read-only file system etc.
             logger.error(error)
         return {}
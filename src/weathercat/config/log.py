@@ -4,15 +4,36 @@
 """Logging configuration."""
 
 import logging
-from rich.console import Console
-from rich.logging import RichHandler
-
-def setup_logging(loglevel):
-    """Set up logging configuration."""
-    logging.basicConfig(level=loglevel,
-                        format="%(message)s",
-                        datefmt="[%T]",
-                        handlers=[RichHandler(console=Console(stderr=True))])
+
+class DeferredRichHandler(logging.Handler):
+    """Rich handler that imports rich only when the first record arrives."""
+
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.handler = None
+
+    def emit(self, record):
+        if self.handler is None:
+            # pylint: disable=import-outside-toplevel
+            from rich.console import Console
+            from rich.logging import RichHandler
+            self.handler = RichHandler(console=Console(stderr=True))
+            self.handler.setFormatter(self.formatter)
+        self.handler.emit(record)
+
+def setup_logging(loglevel, rich=True):
+    """Set up logging configuration.
+
+    Without rich, records are written to stderr as plain text.
+    """
+    if rich:
+        logging.basicConfig(level=loglevel,
+                            format="%(message)s",
+                            datefmt="[%T]",
+                            handlers=[DeferredRichHandler()])
+    else:
+        logging.basicConfig(level=loglevel,
+                            format=logging.BASIC_FORMAT)
 
     # https://stackoverflow.com/a/66416102
     old_factory = logging.getLogRecordFactory()
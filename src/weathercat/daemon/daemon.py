@@ -0,0 +1,140 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Forecast daemon.
+
+Keeps imports, forecasts and the full moon table warm, refreshes loaded
+forecasts after each model update and renders forecasts for
+weathercat-client over a Unix domain socket.
+"""
+
+import io
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+from rich.console import Console
+from weathercat.config import UsageError, parse_arguments
+from weathercat.output import custom_theme, load_full_moons
+from weathercat.protocol import socket_path
+from weathercat.providers import (PROVIDERS, configured_provider,
+                                  get_forecast)
+from weathercat.providers import open_meteo
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait after a model update, as model runs are published late
+REFRESH_DELAY = 300
+
+class ChunkWriter(io.TextIOBase):
+    """Text stream that sends each write to the client as a JSON line."""
+
+    def __init__(self, wfile):
+        super().__init__()
+        self.wfile = wfile
+
+    def write(self, s):
+        self.wfile.write(json.dumps({"output": s}).encode("utf8") + b"\n")
+        return len(s)
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Render a forecast for a client request, as in weathercat.protocol."""
+
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        console = Console(file=ChunkWriter(self.wfile),
+                          theme=custom_theme,
+                          width=request["width"],
+                          force_terminal=request["is_terminal"],
+                          color_system=request["color_system"],
+                          no_color=request.get("no_color", False))
+        status = 0
+        try:
+            args = parse_arguments(request["argv"], exit_on_error=False)
+            self.server.run(args, self.server.conf, console,
+                io.StringIO(request.get("stdin", "")))
+        except UsageError as exc:
+            console.print(str(exc), end="", markup=False, highlight=False)
+            status = 2
+        except LookupError as exc:
+            console.print(str(exc), markup=False, highlight=False)
+            status = 1
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.exception(exc)
+            console.print(f"{type(exc).__name__}: {exc}", markup=False)
+            status = 1
+        self.wfile.write(json.dumps({"status": status}).encode("utf8") + b"\n")
+
+class Server(socketserver.ThreadingUnixStreamServer):
+    """Threaded Unix domain socket server with a configuration.
+
+    Requests are answered by run(args, conf, console, stdin), i.e.
+    weathercat.script.run.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, conf, run):
+        self.conf = conf
+        self.run = run
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)  # stale socket
+        super().__init__(str(path), RequestHandler)
+
+def seconds_until_refresh():
+    """Return seconds until REFRESH_DELAY after the next model update."""
+    interval = open_meteo.MODEL_UPDATE_INTERVAL
+    return interval - (time.time() - REFRESH_DELAY) % interval
+
+def refresh(conf, stop):
+    """Refresh loaded forecasts after each model update until stopped."""
+    provider, options = configured_provider(conf)
+    if PROVIDERS.get(provider) != open_meteo.__name__:
+        return  # only Open-Meteo forecasts are kept loaded
+    options = {**conf.get("forecast_cache", {}), **options}
+    while not stop.wait(seconds_until_refresh()):
+        # current conditions are refreshed on demand
+        payloads = [x for x in map(json.loads, list(open_meteo.loaded))
+                    if "hourly" in x]
+        logger.info(f"Refreshing {len(payloads)} forecasts")
+        try:
+            open_meteo.fetch_payloads(payloads, options)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.warning(f"Refresh failed: {exc}")
+
+def is_running(path):
+    """Test whether a daemon is listening on a socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+def serve(conf, run):
+    """Serve forecasts with run until interrupted."""
+    path = socket_path()
+    if is_running(path):
+        raise RuntimeError(f"A daemon is already listening on {path}")
+    load_full_moons()
+    if "default_location" in conf:
+        try:
+            provider, options = configured_provider(conf)
+            get_forecast(conf["default_location"]["latitude"],
+                         conf["default_location"]["longitude"], provider,
+                         **conf.get("forecast_cache", {}), **options)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.warning(f"Prefetch failed: {exc}")
+    stop = threading.Event()
+    threading.Thread(target=refresh, args=(conf, stop), daemon=True).start()
+    with Server(path, conf, run) as server:
+        logger.info(f"Listening on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            path.unlink(missing_ok=True)
@@ -0,0 +1,4 @@
+"""Convenience imports."""
+
+from .symbols import *
+from .formats import *
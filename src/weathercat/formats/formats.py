@@ -0,0 +1,85 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Machine-readable output straight from forecast data, without rich."""
+
+import json
+from weathercat.formats.symbols import represent_ww
+
+# fields of line output by default
+LINE_FIELDS = ["toponym", "symbol", "temperature", "temperature_min",
+               "temperature_max"]
+
+def summarize(forecast, toponym: str) -> dict:
+    """Return current conditions and today's extremes as flat fields."""
+    symbol, condition = represent_ww(forecast.current["weathercode"])
+    return {
+        "toponym": toponym,
+        "latitude": forecast.latitude,
+        "longitude": forecast.longitude,
+        "time": forecast.current["time"],
+        "temperature": forecast.current["temperature"],
+        "apparent_temperature":
+            forecast.hourly["apparent_temperature"][forecast.current_hour()],
+        "windspeed": forecast.current["windspeed"],
+        "weathercode": forecast.current["weathercode"],
+        "condition": condition,
+        "symbol": symbol.strip(),
+        "temperature_min": forecast.daily["temperature_2m_min"][0],
+        "temperature_max": forecast.daily["temperature_2m_max"][0],
+        "apparent_temperature_min":
+            forecast.daily["apparent_temperature_min"][0],
+        "apparent_temperature_max":
+            forecast.daily["apparent_temperature_max"][0],
+        "uv_index_max": forecast.daily["uv_index_max"][0],
+        "sunrise": forecast.daily["sunrise"][0],
+        "sunset": forecast.daily["sunset"][0],
+    }
+
+def select_fields(summary: dict, fields: list) -> dict:
+    """Select fields of a summary.
+
+    Raise LookupError for unknown fields.
+    """
+    if unknown := [x for x in fields if x not in summary]:
+        raise LookupError(f"Unknown fields: {', '.join(unknown)} "
+                          f"(available: {', '.join(summary)})")
+    return {x: summary[x] for x in fields}
+
+def format_value(value) -> str:
+    """Format a field value compactly."""
+    if isinstance(value, float):
+        return f"{round(value, 1):g}"
+    return str(value)
+
+def format_forecasts(forecasts, toponyms, options: dict, batch=False) -> str:
+    """Format forecasts as JSON, lines of fields or lines of a template.
+
+    The options are format ("json", "line" or "template"), and fields or
+    template. JSON holds whole forecasts unless fields are given, and is an
+    array in batch mode. Templates are format strings over the summary
+    fields, e.g. "{symbol} {temperature:.0f} °C".
+    """
+    fmt, fields = options["format"], options.get("fields")
+    items = list(zip(forecasts, toponyms))
+    if fmt == "json":
+        if fields:
+            data = [select_fields(summarize(forecast, toponym), fields)
+                    for forecast, toponym in items]
+        else:
+            data = [{"toponym": toponym, **forecast.to_dict()}
+                    for forecast, toponym in items]
+        return json.dumps(data if batch else data[0],
+                          ensure_ascii=False) + "\n"
+    lines = []
+    for forecast, toponym in items:
+        summary = summarize(forecast, toponym)
+        if fmt == "template":
+            try:
+                lines.append(options["template"].format_map(summary))
+            except KeyError as exc:
+                raise LookupError(f"Unknown field in template: {exc}") from exc
+        else:
+            lines.append(" ".join(map(format_value, select_fields(
+                summary, fields or LINE_FIELDS).values())))
+    return "".join(f"{line}\n" for line in lines)
@@ -0,0 +1,62 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Weather symbols and style names, without rich."""
+
+import logging
+from bisect import bisect_right
+
+logger = logging.getLogger(__name__)
+
+# WMO Weather interpretation codes (WW) as (symbol, style), indexed by code
+# https://open-meteo.com/en/docs#weathervariables
+WW_CLASSES = {
+    (0,): ("☀️ ", "clear"),
+    (1, 2): ("🌤️ ", "partly_cloudy"),
+    (3,): ("☁️ ", "overcast"),
+    (45, 48): ("🌫️ ", "fog"),
+    (51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82): ("🌧️ ", "rain"),
+    (71, 73, 75, 77, 85, 86): ("❄️ ", "snow"),
+    (95, 96, 99): ("⚡", "thunderstorm"),
+}
+UNKNOWN_WW = ("? ", "unknown")
+WW_TABLE = [next((x for codes, x in WW_CLASSES.items() if code in codes),
+                 UNKNOWN_WW) for code in range(100)]
+
+# upper bounds (m/s) of wind speed classes and their symbols
+# https://www.ilmatieteenlaitos.fi/tuulet
+WIND_THRESHOLDS = (3.5, 7.5, 13.5, 20.5)
+WIND_SYMBOLS = " ⣀⣤⣶⣿"
+
+# upper bounds of UV index classes and their styles
+UVI_THRESHOLDS = (3, 6, 8, 11)
+UVI_STYLES = ("uv_low", "uv_moderate", "uv_high", "uv_very_high", "uv_extreme")
+
+def represent_ww(code: int):
+    """Symbolize and colorize WMO Weather interpretation codes (WW)."""
+    if 0 <= code < len(WW_TABLE) and WW_TABLE[int(code)] is not UNKNOWN_WW:
+        return WW_TABLE[int(code)]
+    logger.debug(f"Unsupported WMO Weather interpretation code: {code}")
+    return UNKNOWN_WW
+
+def represent_wind(speed):
+    """Symbolize wind speeds."""
+    return WIND_SYMBOLS[bisect_right(WIND_THRESHOLDS, speed)]
+
+def uvi_style(uvi):
+    """Return the style of a UV index."""
+    return UVI_STYLES[bisect_right(UVI_THRESHOLDS, uvi)]
+
+def classify_ww(codes):
+    """Return the (symbol, style) of each WMO code in a series."""
+    try:
+        if min(codes, default=0) >= 0:
+            return list(map(WW_TABLE.__getitem__, codes))
+    except (IndexError, TypeError):
+        pass  # codes beyond the table or not integers
+    return [represent_ww(code) for code in codes]
+
+def classify_wind(speeds):
+    """Return the symbols of a wind speed series as a string."""
+    return "".join([WIND_SYMBOLS[bisect_right(WIND_THRESHOLDS, speed)]
+                    for speed in speeds])
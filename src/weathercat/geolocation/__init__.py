@@ -1,3 +1,4 @@
 """Convenience imports."""
 
 from .geolocation import *
+from .gazetteer import *
@@ -0,0 +1,298 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Offline gazetteer for forward and reverse geocoding.
+
+The gazetteer is built from a GeoNames dump of cities (cities15000.txt,
+cities1000.txt etc. from https://download.geonames.org/export/dump/) into a
+single memory-mapped file:
+
+    header   magic, version, place count, name count, string table offset
+    places   unit vector (x, y, z), latitude, longitude, toponym, population
+             in the order of an implicit k-d tree over the unit vectors
+    names    normalized name, place index, sorted by name and population
+    strings  UTF-8 toponyms and names
+
+Reverse lookups search the k-d tree for the nearest place, and forward
+lookups binary search the names, so both touch only a few pages of the
+file. Build with `python -m weathercat.geolocation.gazetteer DUMP
+[--admin1 admin1CodesASCII.txt] [--countries countryInfo.txt]`.
+"""
+
+from __future__ import annotations
+import argparse
+import logging
+import math
+import mmap
+import struct
+import unicodedata
+from pathlib import Path
+import platformdirs
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"WCGZ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII")  # magic, version, -, places, names, strings
+# x, y, z, ϕ, λ, toponym offset, toponym length, population
+PLACE = struct.Struct("<fffffIHI")
+NAME = struct.Struct("<IHI")  # name, length, place
+
+# name entries scanned for qualifiers or prefix matches
+MAX_CANDIDATES = 256
+
+# km from coordinates to the nearest place, beyond which the place doesn't
+# name them, as a chord length of the unit sphere
+EARTH_RADIUS = 6371
+MAX_DISTANCE = 200
+MAX_CHORD = 2*math.sin(MAX_DISTANCE/EARTH_RADIUS/2)
+
+# gazetteers mapped by long-running processes, keyed by path
+opened = {}
+
+def gazetteer_file():
+    """Return the default path of the gazetteer."""
+    return platformdirs.user_data_path("weathercat") / "gazetteer.bin"
+
+def normalize(name: str) -> str:
+    """Fold case, accents and whitespace of a place name."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    return " ".join("".join(x for x in decomposed
+                            if not unicodedata.combining(x))
+                    .casefold().split())
+
+def unit_vector(latitude: float, longitude: float) -> tuple:
+    """Return the unit vector of coordinates.
+
+    Chord lengths between unit vectors grow with great-circle distances,
+    and unlike coordinates they don't wrap around.
+    """
+    ϕ, λ = math.radians(latitude), math.radians(longitude)
+    return (math.cos(ϕ)*math.cos(λ), math.cos(ϕ)*math.sin(λ), math.sin(ϕ))
+
+class Gazetteer:
+    """Memory-mapped gazetteer file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file_object:
+            self.map = mmap.mmap(file_object.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        magic, version, _, self.places, self.names, self.strings = (
+            HEADER.unpack_from(self.map))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} gazetteer")
+        self.names_offset = HEADER.size + self.places*PLACE.size
+
+    def place(self, index: int) -> tuple[str, float, float, int]:
+        """Return (toponym, latitude, longitude, population) of a place."""
+        *_xyz, latitude, longitude, offset, length, population = (
+            PLACE.unpack_from(self.map, HEADER.size + index*PLACE.size))
+        start = self.strings + offset
+        return (self.map[start:start + length].decode("utf8"), latitude,
+                longitude, population)
+
+    def name(self, index: int) -> tuple[str, int]:
+        """Return (normalized name, place index) of a name entry."""
+        offset, length, place = NAME.unpack_from(
+            self.map, self.names_offset + index*NAME.size)
+        start = self.strings + offset
+        return self.map[start:start + length].decode("utf8"), place
+
+    def nearest(self, latitude: float, longitude: float) -> int:
+        """Return the index of the place nearest to coordinates."""
+        target = unit_vector(latitude, longitude)
+        best = [math.inf, -1]
+        unpack_from, data, size = PLACE.unpack_from, self.map, PLACE.size
+        def search(lo, hi, axis):
+            if lo >= hi:
+                return
+            mid = (lo + hi)//2
+            point = unpack_from(data, HEADER.size + mid*size)[:3]
+            distance = sum((a - b)**2 for a, b in zip(point, target))
+            if distance < best[0]:
+                best[:] = distance, mid
+            difference = target[axis] - point[axis]
+            near, far = (((lo, mid), (mid + 1, hi)) if difference < 0
+                         else ((mid + 1, hi), (lo, mid)))
+            search(*near, (axis + 1) % 3)
+            if difference**2 < best[0]:
+                search(*far, (axis + 1) % 3)
+        search(0, self.places, 0)
+        return best[1]
+
+    def reverse(self, latitude: float, longitude: float) -> str | None:
+        """Return the toponym of the place nearest to coordinates.
+
+        Return None if there is no place within MAX_DISTANCE, e.g. at sea.
+        """
+        if not self.places:
+            return None
+        toponym, ϕ, λ, _population = self.place(self.nearest(latitude,
+                                                             longitude))
+        if math.dist(unit_vector(ϕ, λ),
+                     unit_vector(latitude, longitude)) > MAX_CHORD:
+            return None
+        return toponym
+
+    def first_name(self, name: str) -> int:
+        """Return the index of the first name not sorting before name."""
+        lo, hi = 0, self.names
+        while lo < hi:
+            mid = (lo + hi)//2
+            if self.name(mid)[0] < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def forward(self, query: str) -> tuple[str, float, float] | None:
+        """Resolve "name[, qualifier...]" to (toponym, latitude, longitude).
+
+        Exact name matches are preferred to prefix matches, and more
+        populous places to less populous ones. Qualifiers, such as a
+        state or a country, must occur in the toponym.
+        """
+        name, *qualifiers = [normalize(x) for x in query.split(",")]
+        if not name:
+            return None
+        first = self.first_name(name)
+        exact, prefixed = [], []
+        for index in range(first, min(first + MAX_CANDIDATES, self.names)):
+            key, place = self.name(index)
+            if not key.startswith(name):
+                break
+            *result, population = self.place(place)
+            if all(x in normalize(result[0]) for x in qualifiers if x):
+                (exact if key == name else prefixed).append(
+                    (population, *result))
+        if candidates := exact or prefixed:
+            _population, *result = max(candidates, key=lambda x: x[0])
+            return tuple(result)
+        return None
+
+def open_gazetteer(path=None) -> Gazetteer | None:
+    """Open a gazetteer once per process, or return None if unavailable."""
+    path = str(path or gazetteer_file())
+    if path not in opened:
+        try:
+            opened[path] = Gazetteer(path)
+        except (OSError, ValueError) as error:
+            logger.debug(f"No gazetteer: {error}")
+            return None
+    return opened[path]
+
+def compose_place(name: str, admin1: str, country: str) -> str:
+    """Compose a "town, state, country" toponym, skipping repetition."""
+    items = []
+    for item in (name, admin1, country):
+        if item and item not in items:
+            items.append(item)
+    return ", ".join(items)
+
+def read_admin1(path=None) -> dict:
+    """Read state and province names by code from a GeoNames file."""
+    if not path:
+        return {}
+    with open(path, encoding="utf8") as file_object:
+        return dict(line.rstrip("\n").split("\t")[:2]
+                    for line in file_object)
+
+def read_countries(path=None) -> dict:
+    """Read country names by ISO code from a GeoNames file."""
+    if not path:
+        return {}
+    with open(path, encoding="utf8") as file_object:
+        return {fields[0]: fields[4]
+                for fields in (line.rstrip("\n").split("\t")
+                               for line in file_object
+                               if not line.startswith("#"))}
+
+def read_dump(dump, admin1=None, countries=None, min_population=0,
+              alternate_names=False):
+    """Read (toponym, ϕ, λ, population, names) places from GeoNames files."""
+    admin1_names, country_names = read_admin1(admin1), read_countries(countries)
+    with open(dump, encoding="utf8") as file_object:
+        for line in file_object:
+            fields = line.rstrip("\n").split("\t")
+            population = int(fields[14] or 0)
+            if population < min_population:
+                continue
+            name, country_code = fields[1], fields[8]
+            toponym = compose_place(
+                name, admin1_names.get(f"{country_code}.{fields[10]}", ""),
+                country_names.get(country_code, country_code))
+            names = {normalize(name), normalize(fields[2])}
+            if alternate_names and fields[3]:
+                names.update(normalize(x) for x in fields[3].split(","))
+            yield (toponym, float(fields[4]), float(fields[5]), population,
+                   sorted(x for x in names if x))
+
+def kd_order(places: list, axis: int = 0) -> list:
+    """Arrange places with unit vectors into an implicit k-d tree."""
+    if len(places) <= 1:
+        return places
+    places = sorted(places, key=lambda x: x[0][axis])
+    mid = len(places)//2
+    return (kd_order(places[:mid], (axis + 1) % 3) + [places[mid]]
+            + kd_order(places[mid + 1:], (axis + 1) % 3))
+
+def pack_places(places) -> tuple[bytes, bytes, bytes]:
+    """Pack places read by read_dump into place, name and string records."""
+    places = kd_order([(unit_vector(latitude, longitude), toponym, latitude,
+                        longitude, population, names)
+                       for toponym, latitude, longitude, population, names
+                       in places])
+    strings = bytearray()
+    offsets = {}
+    def intern(text):
+        if text not in offsets:
+            offsets[text] = len(strings)
+            strings.extend(text.encode("utf8"))
+        return offsets[text], len(text.encode("utf8"))
+    place_records = bytearray()
+    names = []
+    for index, (xyz, toponym, latitude, longitude, population,
+                place_names) in enumerate(places):
+        place_records += PLACE.pack(*xyz, latitude, longitude,
+                                    *intern(toponym), population)
+        names.extend((name, -population, index) for name in place_names)
+    names.sort()
+    name_records = b"".join(NAME.pack(*intern(name), index)
+                            for name, _population, index in names)
+    return bytes(place_records), name_records, bytes(strings)
+
+def write_gazetteer(places, path):
+    """Write places read by read_dump into a gazetteer file."""
+    place_records, name_records, strings = pack_places(places)
+    place_count = len(place_records)//PLACE.size
+    name_count = len(name_records)//NAME.size
+    strings_offset = HEADER.size + len(place_records) + len(name_records)
+    with open(path, "wb") as file_object:
+        file_object.write(HEADER.pack(MAGIC, VERSION, 0, place_count,
+                                      name_count, strings_offset))
+        file_object.write(place_records)
+        file_object.write(name_records)
+        file_object.write(strings)
+    logger.info(f"Wrote {place_count} places and {name_count} names to "
+                f"{path}")
+
+def main():
+    """Execute."""
+    parser = argparse.ArgumentParser(
+        description="Build the gazetteer from a GeoNames dump.")
+    parser.add_argument("dump", help="cities15000.txt or the like")
+    parser.add_argument("--admin1", help="admin1CodesASCII.txt")
+    parser.add_argument("--countries", help="countryInfo.txt")
+    parser.add_argument("--min-population", type=int, default=0)
+    parser.add_argument("--alternate-names", action="store_true",
+                        help="index alternate names too")
+    parser.add_argument("--output", default=str(gazetteer_file()))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    write_gazetteer(read_dump(args.dump, args.admin1, args.countries,
+                              args.min_population, args.alternate_names),
+                    args.output)
+
+if __name__ == "__main__":
+    main()
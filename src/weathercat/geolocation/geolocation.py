@@ -1,79 +1,224 @@
 """Geolocation."""
 
 from __future__ import annotations
+import functools
 import locale
 import logging
+import math
+import queue
 import re
-from multiprocessing import Process, Queue
-import geocoder
-import geopy
-try:
-    import gi
-    gi.require_version("Geoclue", "2.0")
-    from gi.repository import Geoclue
-except ImportError:
-    gi = None
+import time
+from weathercat.cache import FileCache
+from weathercat.geolocation.gazetteer import open_gazetteer
+from weathercat.network import TIMEOUT, geopy_adapter_factory, get_session
+from weathercat.profiling import span
+from weathercat.threads import spawn
+
+# geopy, geocoder and gi are imported on demand, as they are slow to import
+# pylint: disable=import-outside-toplevel
 
 logger = logging.getLogger(__package__)
 
-def georesolve(location: str) -> tuple[str, float, float]:
-    """Resolve description or coordinates to toponym and coordinates."""
-    geolocator = geopy.geocoders.Nominatim(user_agent="weathercat")
-    language = (locale.getlocale()[0] or "en").replace("_", "-")
-    pattern = r"(?:geo:)?-?([0-9]+\.?[0-9]*)[ ,]+-?([0-9]+\.?[0-9]*).*"
+# seconds to wait for a geolocation fix, and for a more accurate fix once
+# an inaccurate one is available
+GEOLOCATION_TIMEOUT = 10
+ACCURACY_GRACE = 2
+
+# assumed accuracy of IP geolocation in meters
+IP_ACCURACY = 25000
+
+def import_geoclue():
+    """Import Geoclue introspection bindings, or return None."""
+    try:
+        import gi
+        gi.require_version("Geoclue", "2.0")
+        from gi.repository import Geoclue
+    except (ImportError, ValueError):
+        return None
+    return Geoclue
+
+@functools.lru_cache(maxsize=None)
+def nominatim():
+    """Return a shared Nominatim geocoder."""
+    import geopy
+    return geopy.geocoders.Nominatim(user_agent="weathercat",
+                                     timeout=TIMEOUT,
+                                     adapter_factory=geopy_adapter_factory)
+
+def compose_toponym(raw: dict) -> str:
+    """Compose a toponym from a Nominatim response with address details."""
+    address = raw["address"]
+    types = [*[x for x in ["town", "village", "hamlet"] if x in address][:1],
+             *[x for x in ["city", "state"] if x in address][:1],
+             *[x for x in ["country"] if x in address]]
+    items = [address[x] for x in types]
+    if raw["name"] and raw["addresstype"] not in types and len(types) <= 1:
+        items.insert(0, raw["name"])
+    return ", ".join(items)
+
+def parse_coordinates(location: str) -> tuple[float, float] | None:
+    """Parse coordinates from a geo URI or latitude, longitude string."""
+    pattern = r"(?:geo:)?(-?[0-9]+\.?[0-9]*)[ ,]+(-?[0-9]+\.?[0-9]*).*"
     if match_coordinates := re.match(pattern, location):
         latitude, longitude = map(float, match_coordinates.groups())
-        try:
-            response = geolocator.reverse(match_coordinates.string,
-                                          language=language,
-                                          addressdetails=True)
-        except geopy.exc.GeocoderServiceError:
-            logger.warning("Connection to Nominatim failed")
-            return "Reverse geocoding unavailable", latitude, longitude
-        if not response:
-            return "Unknown location", latitude, longitude
-    else:
-        try:
-            response = geolocator.geocode(location,
-                                          language=language,
-                                          addressdetails=True)
-        except geopy.exc.GeocoderServiceError as exc:
+        return latitude, longitude
+    return None
+
+def gazetteer_lookup(location: str, coordinates=None
+                     ) -> tuple[str, float, float] | None:
+    """Resolve with the local gazetteer, or return None."""
+    if not (gazetteer := open_gazetteer()):
+        return None
+    with span("gazetteer lookup"):
+        if coordinates:
+            toponym = gazetteer.reverse(*coordinates)
+            return toponym and (toponym, *coordinates)
+        return gazetteer.forward(location)
+
+def read_cached(cache: FileCache, key: list, coordinates=None
+                ) -> tuple[str, float, float] | None:
+    """Return a cached resolution, or None."""
+    if not (value := cache.get(key)):
+        return None
+    return (value, *coordinates) if coordinates else tuple(value)
+
+def request_nominatim(location: str, coordinates, language: str,
+                      local: bool) -> tuple[tuple[str, float, float], bool]:
+    """Resolve with Nominatim as (resolution, whether to cache it).
+
+    Failed connections fall back to the local gazetteer if local is set.
+    """
+    import geopy
+    try:
+        with span("nominatim request"):
+            if coordinates:
+                response = nominatim().reverse(coordinates, language=language,
+                                               addressdetails=True)
+            else:
+                response = nominatim().geocode(location, language=language,
+                                               addressdetails=True)
+    except geopy.exc.GeocoderServiceError as exc:
+        if local and (resolved := gazetteer_lookup(location, coordinates)):
+            logger.warning("Connection to Nominatim failed, using the local "
+                           "gazetteer")
+            return resolved, False
+        if not coordinates:
             raise ConnectionError("Connection to Nominatim failed") from exc
+        logger.warning("Connection to Nominatim failed")
+        return ("Reverse geocoding unavailable", *coordinates), False
     if not response:
-        raise LookupError(f"Unknown location: {location}")
+        if not coordinates:
+            raise LookupError(f"Unknown location: {location}")
+        return ("Unknown location", *coordinates), False
     logger.debug(f"{response.raw = }")
-    address = response.raw["address"]
-    types = [*[x for x in ["town", "village", "hamlet"] if x in address][:1],
-             *[x for x in ["city", "state"] if x in address][:1],
-             *[x for x in ["country"] if x in address]]
-    items = [address[x] for x in types]
-    if (response.raw["name"] and response.raw["addresstype"] not in types
-            and len(types) <= 1):
-        items.insert(0, response.raw["name"])
-    toponym = ", ".join(items)
-    return toponym, response.latitude, response.longitude
-
-def geolocate() -> tuple[float, float]:
-    """Autodetect geolocation."""
-    def geoclue_locate(queue):
-        clue = Geoclue.Simple.new_sync("something",
-                                       Geoclue.AccuracyLevel.NEIGHBORHOOD,
-                                       None)
-        location = clue.get_location()
-        queue.put((location.get_property("latitude"),
-                   location.get_property("longitude")))
-    if gi:
-        logger.debug("Using Geoclue")
-        queue = Queue()
-        process = Process(target=geoclue_locate, args=(queue,))
-        process.start()
-        process.join(timeout=2)
-        process.terminate()
-        if process.exitcode is None:
-            logger.warning("Geoclue timeout")
-        else:
-            return queue.get()
-
-    if coordinates := geocoder.ip("").latlng:
-        return coordinates
+    return (compose_toponym(response.raw), response.latitude,
+            response.longitude), True
+
+@span("geocoding")
+def georesolve(location: str, offline: bool = False,
+               max_entries: int = 256,
+               gazetteer: str = "fallback") -> tuple[str, float, float]:
+    """Resolve description or coordinates to toponym and coordinates.
+
+    Forward lookups are cached per normalized query and language, reverse
+    lookups per ~1 km coordinate bucket and language. Of concurrent
+    processes missing the same entry, one queries Nominatim while the
+    others wait for its result. In offline mode only the cache and the
+    local gazetteer are consulted. The gazetteer is consulted before
+    Nominatim if gazetteer is "prefer", after a failed connection if
+    "fallback", and never if "off".
+    """
+    cache = FileCache("geocoding", max_entries=max_entries)
+    language = (locale.getlocale()[0] or "en").replace("_", "-")
+    local = gazetteer != "off"
+    if coordinates := parse_coordinates(location):
+        latitude, longitude = coordinates
+        key = ["reverse", round(latitude, 2), round(longitude, 2), language]
+    else:
+        key = ["forward", " ".join(location.casefold().split()), language]
+    if resolved := read_cached(cache, key, coordinates):
+        return resolved
+    if local and (offline or gazetteer == "prefer"):
+        if resolved := gazetteer_lookup(location, coordinates):
+            return resolved
+    if offline and coordinates:
+        return "Reverse geocoding unavailable", latitude, longitude
+    if offline:
+        raise LookupError(f"Location not in geocoding cache: {location}")
+    with cache.lock(key):
+        # resolved by another process while waiting
+        if resolved := read_cached(cache, key, coordinates):
+            return resolved
+        resolved, cacheable = request_nominatim(location, coordinates,
+                                                language, local)
+        if cacheable:
+            cache.set(key, resolved[0] if coordinates else list(resolved))
+    return resolved
+
+def geoclue_locate() -> tuple[float, float, float]:
+    """Locate with Geoclue as (latitude, longitude, accuracy in meters)."""
+    geoclue = import_geoclue()
+    clue = geoclue.Simple.new_sync("weathercat",
+                                   geoclue.AccuracyLevel.NEIGHBORHOOD,
+                                   None)
+    location = clue.get_location()
+    return (location.get_property("latitude"),
+            location.get_property("longitude"),
+            location.get_property("accuracy"))
+
+def ip_locate() -> tuple[float, float, float]:
+    """Locate by IP address as (latitude, longitude, accuracy in meters)."""
+    import geocoder
+    if coordinates := geocoder.ip("", session=get_session(),
+                                  timeout=TIMEOUT).latlng:
+        return *coordinates, IP_ACCURACY
     raise ConnectionError("Connection to an IP geolocation service failed")
+
+@span("geolocation")
+def geolocate(max_age: float = 3600, max_accuracy: float = 10000,
+              offline: bool = False) -> tuple[float, float]:
+    """Autodetect geolocation.
+
+    Geoclue and IP geolocation race each other, and the first fix within
+    max_accuracy meters wins. Otherwise the most accurate fix available at
+    the deadline is used. The last fix is reused for max_age seconds, or
+    regardless of age in offline mode.
+    """
+    cache = FileCache("geolocation", max_entries=1)
+    if fix := cache.get("last"):
+        age = time.time() - fix["time"]
+        if offline or age <= max_age:
+            logger.debug(f"Reusing {fix['source']} fix from {age:.0f} s ago")
+            return fix["latitude"], fix["longitude"]
+    if offline:
+        raise LookupError("No cached geolocation")
+    sources = {"ip": ip_locate}
+    if import_geoclue():
+        logger.debug("Using Geoclue")
+        sources["geoclue"] = geoclue_locate
+    results = spawn(sources)
+    deadline = time.monotonic() + GEOLOCATION_TIMEOUT
+    best = None, (0, 0, math.inf)  # (source, (ϕ, λ, accuracy))
+    for _ in sources:
+        try:
+            source, result = results.get(
+                timeout=max(0, deadline - time.monotonic()))
+        except queue.Empty:
+            logger.warning("Geolocation timeout")
+            break
+        if isinstance(result, Exception):
+            logger.warning(f"{source} geolocation failed: {result}")
+            continue
+        logger.debug(f"{source} geolocation: {result}")
+        if result[2] < best[1][2]:
+            best = source, result
+        if result[2] <= max_accuracy:
+            break
+        deadline = min(deadline, time.monotonic() + ACCURACY_GRACE)
+    if not best[0]:
+        raise ConnectionError("Connection to an IP geolocation service failed")
+    source, (latitude, longitude, accuracy) = best
+    cache.set("last", {"latitude": latitude, "longitude": longitude,
+                       "accuracy": accuracy, "source": source,
+                       "time": time.time()})
+    return latitude, longitude
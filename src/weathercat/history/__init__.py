@@ -0,0 +1,3 @@
+"""Convenience imports."""
+
+from .store import *
@@ -0,0 +1,143 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Forecast history queries.
+
+Tables are scanned through memory maps, and only over the issues that can
+cover the queried valid times, found by binary search of the sorted issued
+column. Times are local, as in `python -m weathercat.history.query
+evolution 2023-07-10T12:00` or `python -m weathercat.history.query stats
+temperature_2m_max --since 2023-06-01`.
+"""
+
+import argparse
+import math
+import sys
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from weathercat.history.store import (KEY_COLUMNS, MISSING_CODE, TABLES,
+                                      HistoryStore)
+
+# seconds from an issue to its last valid time, at most, and to its first
+HORIZON = 17*86400
+HINDSIGHT = 86400
+
+def table_of(variable: str) -> str:
+    """Return the table of a variable.
+
+    Raise LookupError for unknown variables.
+    """
+    for table, columns in TABLES.items():
+        if variable in dict(columns[len(KEY_COLUMNS):]):
+            return table
+    raise LookupError(f"Unknown variable: {variable}")
+
+def nearest_location(store: HistoryStore, latitude: float,
+                     longitude: float) -> int:
+    """Return the index of the recorded location nearest to coordinates.
+
+    Raise LookupError if nothing is recorded.
+    """
+    locations = store.locations()
+    if not locations:
+        raise LookupError(f"No forecast history in {store.directory}")
+    return min(range(len(locations)),
+               key=lambda i: ((locations[i][0] - latitude)**2
+                              + (locations[i][1] - longitude)**2))
+
+def is_missing(value) -> bool:
+    """Test whether a stored value stands for a missing one."""
+    if isinstance(value, int):
+        return value == MISSING_CODE
+    return math.isnan(value)
+
+def scan(store: HistoryStore, location: int, variable: str, since: int,
+         until: int):
+    """Yield (issued, valid, value) of a location for valid times in range."""
+    with store.open_table(table_of(variable)) as columns:
+        issued, valid = columns["issued"], columns["valid"]
+        locations, values = columns["location"], columns[variable]
+        for i in range(bisect_left(issued, since - HORIZON),
+                       bisect_right(issued, until + HINDSIGHT)):
+            if (locations[i] == location and since <= valid[i] <= until
+                    and not is_missing(values[i])):
+                yield issued[i], valid[i], values[i]
+
+def evolution(store: HistoryStore, location: int, variable: str,
+              valid: int) -> list:
+    """Return (issued, value) of every forecast for a valid time."""
+    return [(issued, value) for issued, _valid, value
+            in scan(store, location, variable, valid, valid)]
+
+def statistics(store: HistoryStore, location: int, variable: str,
+               since: int, until: int) -> dict:
+    """Summarize the latest forecasts for valid times in a range.
+
+    The trend is the least squares slope per day. Raise LookupError if
+    there are no forecasts.
+    """
+    latest = {}
+    for _issued, valid, value in scan(store, location, variable, since,
+                                      until):
+        latest[valid] = value  # in issue order
+    if not latest:
+        raise LookupError(f"No {variable} history in range")
+    times, values = zip(*sorted(latest.items()))
+    mean_time, mean = sum(times)/len(times), sum(values)/len(values)
+    variance = sum((t - mean_time)**2 for t in times)
+    trend = (sum((t - mean_time)*(v - mean) for t, v in zip(times, values))
+             / variance*86400 if variance else 0.0)
+    return {"count": len(values), "min": min(values), "max": max(values),
+            "mean": mean, "trend_per_day": trend}
+
+def parse_time(text: str) -> int:
+    """Parse a local ISO date or time into Unix time."""
+    return int(datetime.fromisoformat(text).timestamp())
+
+def format_time(timestamp: int) -> str:
+    """Format Unix time as a local ISO time."""
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%dT%H:%M")
+
+def main(argv=None):
+    """Execute."""
+    parser = argparse.ArgumentParser(
+        description="Query the forecast history.")
+    parser.add_argument("--directory", help="history directory")
+    parser.add_argument("--location", metavar="LATITUDE,LONGITUDE",
+                        help="nearest recorded location (default: first)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("locations", help="list recorded locations")
+    compare = commands.add_parser(
+        "evolution", help="compare forecasts of issue times for a time")
+    compare.add_argument("valid", type=parse_time, metavar="TIME")
+    compare.add_argument("--variable", default="temperature_2m")
+    summary = commands.add_parser(
+        "stats", help="min, max, mean and trend of the latest forecasts")
+    summary.add_argument("variable")
+    summary.add_argument("--since", type=parse_time, default=0)
+    summary.add_argument("--until", type=parse_time, default=2**62)
+    args = parser.parse_args(argv)
+    store = HistoryStore(args.directory)
+    try:
+        if args.command == "locations":
+            for i, (ϕ, λ, issued) in enumerate(store.locations()):
+                print(f"{i}  {ϕ}, {λ}  last issued {format_time(issued)}")
+            return
+        location = 0
+        if args.location:
+            location = nearest_location(store, *map(float,
+                                                    args.location.split(",")))
+        if args.command == "evolution":
+            for issued, value in evolution(store, location, args.variable,
+                                           args.valid):
+                print(f"{format_time(issued)}  {value:g}")
+        else:
+            for name, value in statistics(store, location, args.variable,
+                                          args.since, args.until).items():
+                print(f"{name:<14}{value:g}")
+    except LookupError as exc:
+        print(exc)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Append-only columnar forecast history.
+
+Every fetched forecast is appended as rows of an hourly and a daily table,
+one row per location, issue time and valid time. Each column is a file of
+fixed-width values in native byte order, so that columns can be memory
+mapped and scanned without loading a table. Rows are appended in issue
+time order, which makes the issued column sorted. Recording is opt-in and
+happens only while a store is active.
+"""
+
+import contextlib
+import json
+import logging
+import math
+import mmap
+import os
+import tempfile
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+import platformdirs
+from weathercat.cache import acquire
+from weathercat.profiling import span
+
+logger = logging.getLogger(__name__)
+
+# columns of each table as (name, array typecode)
+KEY_COLUMNS = [("location", "H"), ("issued", "q"), ("valid", "q")]
+TABLES = {
+    "hourly": [*KEY_COLUMNS, ("temperature_2m", "f"),
+               ("apparent_temperature", "f"), ("weathercode", "B"),
+               ("windspeed_10m", "f")],
+    "daily": [*KEY_COLUMNS, ("weathercode", "B"), ("temperature_2m_max", "f"),
+              ("temperature_2m_min", "f"), ("apparent_temperature_max", "f"),
+              ("apparent_temperature_min", "f"), ("uv_index_max", "f"),
+              ("uv_index_clear_sky_max", "f")],
+}
+
+# seconds between issues, as Open-Meteo updates its forecasts hourly
+ISSUE_INTERVAL = 3600
+
+# stand-in for missing weather codes
+MISSING_CODE = 255
+
+def history_directory():
+    """Return the default history directory."""
+    return platformdirs.user_data_path("weathercat") / "history"
+
+def to_unix(local_time: str, utc_offset: int) -> int:
+    """Convert a local ISO date or time to Unix time."""
+    naive = datetime.fromisoformat(local_time)
+    return int(naive.replace(tzinfo=timezone.utc).timestamp()) - utc_offset
+
+def fill(values: list, typecode: str) -> list:
+    """Replace missing values with NaN or MISSING_CODE."""
+    missing = math.nan if typecode == "f" else MISSING_CODE
+    return [missing if x is None else x for x in values]
+
+def find_location(locations: list, latitude: float, longitude: float) -> int:
+    """Return the index of a location, adding it to locations if missing."""
+    for index, (ϕ, λ, _last_issued) in enumerate(locations):
+        if (ϕ, λ) == (latitude, longitude):
+            return index
+    locations.append([latitude, longitude, None])
+    return len(locations) - 1
+
+class HistoryStore:
+    """Forecast history in a directory of column files."""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory else history_directory()
+
+    def column_path(self, table: str, name: str, typecode: str):
+        """Return the file path of a column."""
+        return self.directory / table / f"{name}.{typecode}"
+
+    def locations(self) -> list:
+        """Return recorded locations as [latitude, longitude, last issue]."""
+        try:
+            return json.loads((self.directory / "locations.json").read_text(
+                encoding="utf8"))
+        except (OSError, ValueError):
+            return []
+
+    def write_locations(self, locations: list):
+        """Replace the location list atomically."""
+        with tempfile.NamedTemporaryFile(mode="w", encoding="utf8",
+                                         dir=self.directory, suffix=".tmp",
+                                         delete=False) as file_object:
+            json.dump(locations, file_object)
+        os.replace(file_object.name, self.directory / "locations.json")
+
+    def rows(self, table: str) -> int:
+        """Return the number of complete rows of a table."""
+        sizes = []
+        for name, typecode in TABLES[table]:
+            try:
+                size = self.column_path(table, name, typecode).stat().st_size
+            except FileNotFoundError:
+                size = 0
+            sizes.append(size // array(typecode).itemsize)
+        return min(sizes)
+
+    def append_rows(self, table: str, columns: dict):
+        """Append rows to a table, dropping any torn rows first."""
+        (self.directory / table).mkdir(parents=True, exist_ok=True)
+        rows = self.rows(table)
+        for name, typecode in TABLES[table]:
+            path = self.column_path(table, name, typecode)
+            with open(path, "ab") as file_object:
+                file_object.truncate(rows*array(typecode).itemsize)
+                array(typecode, fill(columns[name], typecode)).tofile(
+                    file_object)
+
+    def append(self, latitude: float, longitude: float, data: dict,
+               issued: float):
+        """Append a forecast in the Open-Meteo format.
+
+        A location gets one issue per ISSUE_INTERVAL, so that repeated
+        fetches within an update are recorded once.
+        """
+        issued = int(issued - issued % ISSUE_INTERVAL)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / "lock", "a", encoding="utf8") as lock:
+            acquire(lock, timeout=10)
+            locations = self.locations()
+            location = find_location(locations, latitude, longitude)
+            if locations[location][2] == issued:
+                return
+            offset = data["utc_offset_seconds"]
+            for table, columns in TABLES.items():
+                series = data[table]
+                count = len(series["time"])
+                self.append_rows(table, {
+                    "location": [location]*count,
+                    "issued": [issued]*count,
+                    "valid": [to_unix(x, offset) for x in series["time"]],
+                    **{name: series[name] for name, _typecode
+                       in columns[len(KEY_COLUMNS):]}})
+            locations[location][2] = issued
+            self.write_locations(locations)
+        logger.debug(f"Recorded forecast for {latitude}, {longitude}")
+
+    @contextlib.contextmanager
+    def open_table(self, table: str):
+        """Map the complete rows of a table as a memoryview per column.
+
+        The views, and any slices of them, must not outlive the block.
+        """
+        rows = self.rows(table)
+        with contextlib.ExitStack() as stack:
+            columns = {}
+            for name, typecode in TABLES[table]:
+                if not rows:
+                    columns[name] = memoryview(array(typecode))
+                    continue
+                file_object = stack.enter_context(open(
+                    self.column_path(table, name, typecode), "rb"))
+                mapped = stack.enter_context(mmap.mmap(
+                    file_object.fileno(), 0, access=mmap.ACCESS_READ))
+                # views are released in reverse order, before the map
+                whole = memoryview(mapped)
+                stack.callback(whole.release)
+                complete = whole[:rows*array(typecode).itemsize]
+                stack.callback(complete.release)
+                columns[name] = complete.cast(typecode)
+                stack.callback(columns[name].release)
+            yield columns
+
+active = None  # pylint: disable=invalid-name
+
+def start(directory=None) -> HistoryStore:
+    """Start recording fetched forecasts."""
+    global active  # pylint: disable=global-statement
+    active = HistoryStore(directory)
+    return active
+
+def record(latitude: float, longitude: float, data: dict, issued: float):
+    """Record a forecast into the active store, if any."""
+    if not active:
+        return
+    with span("history"):
+        try:
+            active.append(latitude, longitude, data, issued)
+        except (OSError, KeyError, TypeError, ValueError) as error:
+            logger.warning(f"Recording forecast history failed: {error}")
@@ -0,0 +1,4 @@
+"""Convenience imports."""
+
+from .session import *
+from .mirrors import *
@@ -0,0 +1,52 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Mirror selection."""
+
+import logging
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from weathercat.cache import FileCache
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait for a connection to a mirror
+PROBE_TIMEOUT = 1
+
+# seconds a selected mirror is kept
+SELECTION_TTL = 86400
+
+def connect_time(url: str) -> float:
+    """Return the TCP connection time to the host of a URL in seconds."""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    start = time.perf_counter()
+    with socket.create_connection((parts.hostname, port),
+                                  timeout=PROBE_TIMEOUT):
+        return time.perf_counter() - start
+
+def rank_mirrors(urls: list) -> list:
+    """Order URLs by connection time, unreachable ones last.
+
+    The ranking is cached for SELECTION_TTL seconds.
+    """
+    if len(urls) <= 1:
+        return list(urls)
+    cache = FileCache("mirrors", max_entries=8)
+    if ranking := cache.get(sorted(urls)):
+        return ranking
+    def probe(url):
+        try:
+            return connect_time(url)
+        except OSError as exc:
+            logger.debug(f"{url} is unreachable: {exc}")
+            return float("inf")
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        times = list(executor.map(probe, urls))
+    ranking = [url for _time, _i, url in sorted(zip(times, range(len(urls)),
+                                                    urls))]
+    logger.debug(f"Mirrors by connection time: {ranking}")
+    cache.set(sorted(urls), ranking, expires=time.time() + SELECTION_TTL)
+    return ranking
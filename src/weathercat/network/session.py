@@ -0,0 +1,74 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Shared HTTP session."""
+
+import functools
+import importlib.util
+import logging
+from weathercat.profiling import count
+
+# requests and geopy are imported on demand, as they are slow to import
+# pylint: disable=import-outside-toplevel
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (3.05, 5)
+
+@functools.lru_cache(maxsize=None)
+def get_session():
+    """Return a pooled keep-alive session shared by all HTTP clients.
+
+    Transient server errors of idempotent requests are retried up to three
+    times with exponential backoff (0, 0.5 and 1 s), connection failures
+    once.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    retry = Retry(total=3,
+                  connect=1,
+                  backoff_factor=0.25,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({"GET", "HEAD"}),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    encodings = ["gzip", "deflate"]
+    if (importlib.util.find_spec("brotli")
+            or importlib.util.find_spec("brotlicffi")):
+        encodings.append("br")
+    session.headers["Accept-Encoding"] = ", ".join(encodings)
+    session.headers["User-Agent"] = "weathercat"
+    session.hooks["response"].append(count_response)
+    return session
+
+def count_response(response, *_args, **_kwargs):
+    """Count requests and transferred bytes for the active profile."""
+    count("http.requests")
+    count("http.bytes.decoded", len(response.content))
+    count("http.bytes.received", response.raw.tell())
+
+def geopy_adapter_factory(**kwargs):
+    """Create a geopy adapter that sends requests through the shared session."""
+    from geopy.adapters import RequestsAdapter
+
+    class SharedSessionAdapter(RequestsAdapter):
+        """Requests adapter using the shared session."""
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.session.close()
+            self.session = get_session()
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            pass  # keep the shared session open
+
+        def __del__(self):
+            pass  # keep the shared session open
+
+    return SharedSessionAdapter(**kwargs)
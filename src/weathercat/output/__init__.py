@@ -1,3 +1,4 @@
 """Convenience imports."""
 
 from .output import *
+from .moon import *
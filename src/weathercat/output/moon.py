@@ -0,0 +1,205 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Lunar phases.
+
+Full moon instants are precomputed with skyfield into full_moons.txt, so
+rendering needs neither the ephemeris nor root finding. Regenerate the table
+with `python -m weathercat.output.moon [START_YEAR END_YEAR]`.
+
+Outside the table, skyfield is used if the DE421 ephemeris has already been
+downloaded. The ephemeris is memory-mapped by jplephem, so only the pages
+covering the requested dates are read. Otherwise full moons are approximated
+with Meeus' algorithm (Astronomical Algorithms, 2nd ed., ch. 49). Over
+2000–2050 the approximation is within 30 seconds of skyfield with DE421
+(mean absolute error 8 seconds), so only a full moon within half a minute
+of midnight may be assigned to the neighbouring date.
+"""
+
+from __future__ import annotations
+import functools
+import importlib.util
+import logging
+import math
+import pkgutil
+import sys
+from bisect import bisect_left
+from datetime import datetime, timezone as dt_timezone
+import platformdirs
+from weathercat.profiling import span
+
+logger = logging.getLogger(__package__)
+
+# Meeus, table 49.A: full moon corrections as (coefficient, power of E,
+# multiples of M, M′, F, Ω)
+FULL_MOON_TERMS = [
+    (-0.40614, 0, 0, 1, 0, 0),
+    (0.17302, 1, 1, 0, 0, 0),
+    (0.01614, 0, 0, 2, 0, 0),
+    (0.01043, 0, 0, 0, 2, 0),
+    (0.00734, 1, -1, 1, 0, 0),
+    (-0.00515, 1, 1, 1, 0, 0),
+    (0.00209, 2, 2, 0, 0, 0),
+    (-0.00111, 0, 0, 1, -2, 0),
+    (-0.00057, 0, 0, 1, 2, 0),
+    (0.00056, 1, 1, 2, 0, 0),
+    (-0.00042, 0, 0, 3, 0, 0),
+    (0.00042, 1, 1, 0, 2, 0),
+    (0.00038, 1, 1, 0, -2, 0),
+    (-0.00024, 1, -1, 2, 0, 0),
+    (-0.00017, 0, 0, 0, 0, 1),
+    (-0.00007, 0, 2, 1, 0, 0),
+    (0.00004, 0, 0, 2, -2, 0),
+    (0.00004, 0, 3, 0, 0, 0),
+    (0.00003, 0, 1, 1, -2, 0),
+    (0.00003, 0, 0, 2, 2, 0),
+    (-0.00003, 0, 1, 1, 2, 0),
+    (0.00003, 0, -1, 1, 2, 0),
+    (-0.00002, 0, -1, 1, -2, 0),
+    (-0.00002, 0, 1, 3, 0, 0),
+    (0.00002, 0, 0, 4, 0, 0),
+]
+
+# Meeus, ch. 49: planetary arguments A1–A14 as (coefficient, constant,
+# rate per lunation)
+PLANETARY_TERMS = [
+    (0.000325, 299.77, 0.107408),
+    (0.000165, 251.88, 0.016321),
+    (0.000164, 251.83, 26.651886),
+    (0.000126, 349.42, 36.412478),
+    (0.000110, 84.66, 18.206239),
+    (0.000062, 141.74, 53.303771),
+    (0.000060, 207.14, 2.453732),
+    (0.000056, 154.84, 7.306860),
+    (0.000047, 34.52, 27.261239),
+    (0.000042, 207.19, 0.121824),
+    (0.000040, 291.34, 1.844379),
+    (0.000037, 161.72, 24.198154),
+    (0.000035, 239.56, 25.513099),
+    (0.000023, 331.55, 3.592518),
+]
+
+def ephemeris_file():
+    """Return the path of the DE421 ephemeris."""
+    return platformdirs.user_data_path("weathercat") / "de421.bsp"
+
+@functools.lru_cache(maxsize=None)
+@span("ephemeris")
+def load_ephemeris(download=False):
+    """Open DE421 ephemeris memory-mapped, or return None if missing.
+
+    The ephemeris is downloaded only if requested.
+    """
+    if not importlib.util.find_spec("skyfield"):
+        return None
+    from skyfield import api  # pylint: disable=import-outside-toplevel
+    file = ephemeris_file()
+    if file.is_file():
+        logger.debug(f"Opening {file}")
+        return api.load_file(file)
+    if not download:
+        logger.debug(f"{file} is missing")
+        return None
+    load = api.Loader(file.parent, verbose=True)
+    url = load.build_url(file.name)
+    logger.info(f"Downloading ephemeris DE421 from {url}")
+    return load(file.name)
+
+def compute_full_moons(start: datetime, end: datetime,
+                       eph=None) -> list[float]:
+    """Compute full moon instants as Unix times with skyfield."""
+    # pylint: disable=import-outside-toplevel
+    from skyfield import api
+    from skyfield import almanac
+    timescale = api.load.timescale()
+    times, phases = almanac.find_discrete(
+        timescale.from_datetime(start),
+        timescale.from_datetime(end),
+        almanac.moon_phases(eph or load_ephemeris(download=True)))
+    return [time.utc_datetime().timestamp()
+            for time, phase in zip(times, phases)
+            if almanac.MOON_PHASES[phase] == "Full Moon"]
+
+def delta_t(year: float) -> float:
+    """Approximate TT − UT in seconds (Espenak and Meeus)."""
+    t = year - 2000
+    if 1986 <= year < 2005:
+        return (63.86 + 0.3345*t - 0.060374*t**2 + 0.0017275*t**3
+                + 0.000651814*t**4 + 0.00002373599*t**5)
+    if 2005 <= year < 2050:
+        return 62.92 + 0.32217*t + 0.005589*t**2
+    if 2050 <= year < 2150:
+        return -20 + 32*((year - 1820)/100)**2 - 0.5628*(2150 - year)
+    return -20 + 32*((year - 1820)/100)**2
+
+def meeus_full_moon(k: float) -> float:
+    """Approximate the full moon of lunation k + 0.5 as Unix time."""
+    k += 0.5
+    t = k/1236.85
+    jde = (2451550.09766 + 29.530588861*k + 0.00015437*t**2
+           - 0.000000150*t**3 + 0.00000000073*t**4)
+    e = 1 - 0.002516*t - 0.0000074*t**2
+    m = math.radians(2.5534 + 29.10535670*k - 0.0000014*t**2
+                     - 0.00000011*t**3)
+    m_ = math.radians(201.5643 + 385.81693528*k + 0.0107582*t**2
+                      + 0.00001238*t**3 - 0.000000058*t**4)
+    f = math.radians(160.7108 + 390.67050284*k - 0.0016118*t**2
+                     - 0.00000227*t**3 + 0.000000011*t**4)
+    omega = math.radians(124.7746 - 1.56375588*k + 0.0020672*t**2
+                         + 0.00000215*t**3)
+    jde += sum(coefficient * e**power * math.sin(a*m + b*m_ + c*f + d*omega)
+               for coefficient, power, a, b, c, d in FULL_MOON_TERMS)
+    jde += sum(coefficient * math.sin(math.radians(
+                   constant + rate*k - (0.009173*t**2 if i == 0 else 0)))
+               for i, (coefficient, constant, rate)
+               in enumerate(PLANETARY_TERMS))
+    year = 2000 + (jde - 2451545.0)/365.25
+    return (jde - 2440587.5)*86400 - delta_t(year)
+
+def approximate_full_moons(start: datetime, end: datetime) -> list[float]:
+    """Approximate full moon instants as Unix times with Meeus' algorithm."""
+    start_time, end_time = start.timestamp(), end.timestamp()
+    year = 1970 + start_time/(365.25*86400)
+    k = math.floor((year - 2000)*12.3685) - 1
+    full_moons = []
+    while (time := meeus_full_moon(k)) <= end_time:
+        if time >= start_time:
+            full_moons.append(time)
+        k += 1
+    return full_moons
+
+@functools.lru_cache(maxsize=None)
+@span("full moon table")
+def load_full_moons() -> tuple[tuple[int, int], list[int]]:
+    """Load the precomputed table as (coverage, sorted Unix times)."""
+    lines = [line for line in pkgutil.get_data(__name__, "full_moons.txt")
+             .decode("ascii").splitlines() if not line.startswith("#")]
+    coverage = tuple(map(int, lines[0].split()))
+    return coverage, [int(line) for line in lines[1:]]
+
+def full_moon_between(start: datetime, end: datetime) -> bool:
+    """Indicate whether a full moon occurs between two aware datetimes."""
+    (first, last), full_moons = load_full_moons()
+    start_time, end_time = start.timestamp(), end.timestamp()
+    if first <= start_time and end_time <= last:
+        i = bisect_left(full_moons, start_time)
+        return i < len(full_moons) and full_moons[i] <= end_time
+    logger.debug(f"{start} is not in the full moon table")
+    if eph := load_ephemeris():
+        return bool(compute_full_moons(start, end, eph))
+    return bool(approximate_full_moons(start, end))
+
+def write_full_moons(start_year: int, end_year: int, file=sys.stdout):
+    """Write a full moon table for [start_year, end_year)."""
+    start = datetime(start_year, 1, 1, tzinfo=dt_timezone.utc)
+    end = datetime(end_year, 1, 1, tzinfo=dt_timezone.utc)
+    print(f"# Full moon instants from {start_year} to {end_year} as Unix "
+          f"times, computed by skyfield from DE421.\n"
+          f"# The first line gives the time range covered.", file=file)
+    print(round(start.timestamp()), round(end.timestamp()), file=file)
+    for time in compute_full_moons(start, end):
+        print(round(time), file=file)
+
+if __name__ == "__main__":
+    write_full_moons(*(map(int, sys.argv[1:3]) if len(sys.argv) > 2
+                       else (2000, 2050)))
@@ -3,20 +3,22 @@
 
 """Output."""
 
+import io
 import logging
+from bisect import bisect_right
 from collections import defaultdict
 from datetime import datetime
+from itertools import islice
 from zoneinfo import ZoneInfo
-import platformdirs
+from rich.cells import cell_len
 from rich.console import Console
 from rich.theme import Theme
 from rich.table import Table
-try:
-    from skyfield import api
-    from skyfield import almanac
-    skyfield_is_available = True  # pylint: disable=invalid-name
-except ImportError:
-    skyfield_is_available = False  # pylint: disable=invalid-name
+from rich.text import Span, Text
+from weathercat.formats.symbols import (classify_wind, classify_ww,
+                                        represent_ww, represent_wind,
+                                        uvi_style)
+from weathercat.output.moon import full_moon_between
 
 logger = logging.getLogger(__package__)
 
@@ -32,6 +34,7 @@ custom_theme = Theme({
     "rain": "reverse bright_blue",
     "snow": "reverse cyan",
     "thunderstorm": "reverse bright_magenta",
+    "unknown": "reverse red",
     "feels_like_warmer": "bright_red",
     "feels_like_colder": "bright_cyan",
     "uv_low": "bright_green",
@@ -41,185 +44,333 @@ custom_theme = Theme({
     "uv_extreme": "magenta",
 })
 
-def represent_ww(code: int):  # pylint: disable=too-many-return-statements
-    """Symbolize and colorize WMO Weather interpretation codes (WW)."""
-    # https://open-meteo.com/en/docs#weathervariables
-    if code in (0,):
-        return "☀️ ", "clear"
-    if code in (1, 2):
-        return "🌤️ ", "partly_cloudy"
-    if code in (3,):
-        return "☁️ ", "overcast"
-    if code in (45, 48):
-        return "🌫️ ", "fog"
-    if code in (51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82):
-        return "🌧️ ", "rain"
-    if code in (71, 73, 75, 77, 85, 86):
-        return "❄️ ", "snow"
-    if code in (95, 96, 99):
-        return "⚡", "thunderstorm"
-    raise ValueError("Unsupported WMO Weather interpretation code: {code}")
-
-def represent_wind(speed):
-    """Symbolize wind speeds."""
-    # https://www.ilmatieteenlaitos.fi/tuulet
-    if speed < 3.5:
-        return " "
-    if speed < 7.5:
-        return "⣀"
-    if speed < 13.5:
-        return "⣤"
-    if speed < 20.5:
-        return "⣶"
-    return "⣿"
-
 def represent_uvi(uvi):
     """Colorize UV index."""
-    if uvi < 3:
-        return f"[uv_low]{uvi}[/]"
-    if uvi < 6:
-        return f"[uv_moderate]{uvi}[/]"
-    if uvi < 8:
-        return f"[uv_high]{uvi}[/]"
-    if uvi < 11:
-        return f"[uv_very_high]{uvi}[/]"
-    return f"[uv_extreme]{uvi}[/]"
+    return to_markup([(f"{uvi}", uvi_style(uvi))])
 
-def represent_temperature(temperature, apparent_temperature):
-    """Colorize temperature based on apparent temperature."""
+def temperature_styles(temperature, apparent_temperature):
+    """Return the styles of a temperature based on apparent temperature."""
     # https://www.ilmatieteenlaitos.fi/saamerkkien-selitykset
-    string = f"{str(round(temperature)).replace('-', '−')}"
     if apparent_temperature >= temperature + 2:
-        return f"[feels_like_warmer]{string}[/]"
+        return ("feels_like_warmer",)
     if apparent_temperature <= temperature - 5:
-        return f"[feels_like_colder]{string}[/]"
-    return string
+        return ("feels_like_colder",)
+    return ()
+
+def format_temperature(temperature):
+    """Format a temperature with a proper minus sign."""
+    return f"{str(round(temperature)).replace('-', '−')}"
+
+def represent_temperature(temperature, apparent_temperature):
+    """Colorize temperature based on apparent temperature."""
+    return to_markup([(format_temperature(temperature),
+                       *temperature_styles(temperature,
+                                           apparent_temperature))])
+
+def to_markup(pieces):
+    """Join (string, *styles) pieces into console markup."""
+    return "".join("".join(f"[{style}]" for style in styles) + string
+                   + "[/]"*len(styles) for string, *styles in pieces)
+
+def to_text(pieces):
+    """Join (string, *styles) pieces into styled text without markup."""
+    text = Text()
+    for string, *styles in pieces:
+        start = len(text)
+        text.append(string)
+        text.spans.extend(Span(start, start + len(string), style)
+                          for style in styles)
+    return text
 
 def fabricate_moon_function():
     """Create a lunar phase representation function."""
-    if skyfield_is_available:
-        timescale = api.load.timescale()
-        directory = platformdirs.user_data_path("weathercat")
-        filename = "de421.bsp"
-        file = directory / filename
-        try:
-            eph = api.load_file(file)
-            logger.debug(f"Loaded {file}")
-        except FileNotFoundError:
-            load = api.Loader(directory, verbose=True)
-            url = load.build_url(filename)
-            logger.info(f"Downloading ephemeris DE421 from {url}")
-            eph = load(filename)
-        def moon(date, timezone):
-            """Indicate whether the full moon occurs during a given date."""
-            dt0 = datetime.fromisoformat(date).replace(
-                tzinfo=ZoneInfo(timezone))
-            dt1 = datetime.combine(dt0, dt0.time().max).replace(
-                tzinfo=ZoneInfo(timezone))
-            start_time = timescale.from_datetime(dt0)
-            end_time = timescale.from_datetime(dt1)
-            _times, phases = almanac.find_discrete(start_time,
-                                                   end_time,
-                                                   almanac.moon_phases(eph))
-            del _times  # unused
-            if "Full Moon" in [almanac.MOON_PHASES[phase] for phase in phases]:
-                return "🌕"
-            return ""
-        return moon
-    return lambda *args: ""
-
-def output(forecast, toponym):
-    """Output a forecast."""
-    # pylint: disable=too-many-locals
-    # pylint: disable=too-many-statements
-    superscript = {ord(k): v for k, v in zip("+-−0123456789", "⁺⁻⁻⁰¹²³⁴⁵⁶⁷⁸⁹")}
-    subscript = {ord(k): v for k, v in zip("+-−0123456789", "₊₋₋₀₁₂₃₄₅₆₇₈₉")}
-
-    forecast_table = Table.grid(padding=(0, 1))
-    forecast_table.add_column("hourly", no_wrap=True)
-    forecast_table.add_column("day")
-    forecast_table.add_column("symbol")
-    forecast_table.add_column("min_temperature", no_wrap=True, justify="right")
-    forecast_table.add_column("max_temperature", no_wrap=True, justify="right")
-    forecast_table.add_column("uvi", no_wrap=True)
-    forecast_table.add_column("moon")
+    def moon(date, timezone):
+        """Indicate whether the full moon occurs during a given date."""
+        dt0 = datetime.fromisoformat(date).replace(
+            tzinfo=ZoneInfo(timezone))
+        dt1 = datetime.combine(dt0, dt0.time().max).replace(
+            tzinfo=ZoneInfo(timezone))
+        if full_moon_between(dt0, dt1):
+            return "🌕"
+        return ""
+    return moon
+
+SUPERSCRIPT = {ord(k): v for k, v in zip("+-−0123456789", "⁺⁻⁻⁰¹²³⁴⁵⁶⁷⁸⁹")}
+SUBSCRIPT = {ord(k): v for k, v in zip("+-−0123456789", "₊₋₋₀₁₂₃₄₅₆₇₈₉")}
+
+HOUR_MARKERS = "00    06    12    18    24".translate(SUBSCRIPT)
+
+# columns of the daily forecast view
+FORECAST_COLUMNS = [
+    ("hourly", {"no_wrap": True}),
+    ("day", {}),
+    ("symbol", {}),
+    ("min_temperature", {"no_wrap": True, "justify": "right"}),
+    ("max_temperature", {"no_wrap": True, "justify": "right"}),
+    ("uvi", {"no_wrap": True}),
+    ("moon", {}),
+]
+
+def forecast_rows(forecast):
+    """Yield the rows of the daily forecast view, three per day.
+
+    Cells are lists of (string, *styles) pieces.
+    """
     hour = datetime.now().hour
-    markers = defaultdict(lambda: "00    06    12    18    24"
-                                  .translate(subscript))
+    markers = defaultdict(lambda: HOUR_MARKERS)
     markers[0] = markers[0][:hour] + "🐈" + markers[0][hour + 2:]
-    # pylint: disable=unnecessary-lambda-assignment
-    condition = lambda i: represent_ww(forecast["hourly"]["weathercode"][i])[1]
-    wind = lambda i: represent_wind(forecast["hourly"]["windspeed_10m"][i])
-    # pylint: enable=unnecessary-lambda-assignment
+    # pylint: disable-next=unnecessary-lambda-assignment
+    temperature = lambda day, extreme: (
+        (format_temperature(forecast.daily[f"temperature_2m_{extreme}"][day]),
+         *temperature_styles(
+             forecast.daily[f"temperature_2m_{extreme}"][day],
+             forecast.daily[f"apparent_temperature_{extreme}"][day])))
     moon = fabricate_moon_function()
-    for day in range(7):
-        condition_bar = "".join(["[" + condition(i) + "]" + wind(i) + "[/]"
-                                 for i in [day*24 + h for h in range(24)]])
+    for day in range(len(forecast.daily)):
+        hours = slice(day*24, (day + 1)*24)
+        condition_bar = list(zip(
+            classify_wind(forecast.hourly["windspeed_10m"][hours]),
+            [style for _symbol, style
+             in classify_ww(forecast.hourly["weathercode"][hours])]))
         weekday = datetime.fromisoformat(
-            forecast["daily"]["time"][day]).strftime("%a")
-        weather_symbol = represent_ww(forecast["daily"]["weathercode"][day])[0]
-        min_temperature = represent_temperature(
-            forecast["daily"]["temperature_2m_min"][day],
-            forecast["daily"]["apparent_temperature_min"][day])
-        max_temperature = represent_temperature(
-            forecast["daily"]["temperature_2m_max"][day],
-            forecast["daily"]["apparent_temperature_max"][day])
-        uvi = represent_uvi(
-            round(forecast["daily"]["uv_index_max"][day])
-            ).translate(subscript)
-        moon_symbol = moon(forecast["daily"]["time"][day],
-                           forecast["timezone"])
+            forecast.daily["time"][day]).strftime("%a")
+        weather_symbol = represent_ww(forecast.daily["weathercode"][day])[0]
+        uvi = round(forecast.daily["uv_index_max"][day])
+        moon_symbol = moon(forecast.daily["time"][day],
+                           forecast.timezone)
         temperatures = "  ".join(
-            f'{round(forecast["hourly"]["temperature_2m"][i]):>3}' for i in
-            [day*24 + h for h in range(2, 23, 5)]).translate(superscript)
-        forecast_table.add_row(
-            f" [dim]{markers[day]}[/]")
-        forecast_table.add_row(
-            f"  {condition_bar}",
-            f"[dim]{weekday}[/] ",
-            f"{weather_symbol}",
-            f" {min_temperature} [dim]/[/]",
-            f"{max_temperature} [dim]°C[/]",
-            f" [dim]ᵁⱽ[/]{uvi}",
-            f" {moon_symbol}")
-        forecast_table.add_row(
-            f"  {temperatures}")
-
-    sunrise = forecast["daily"]["sunrise"][0].split("T")[1]
-    sunset = forecast["daily"]["sunset"][0].split("T")[1]
-    uvi_clear_sky = represent_uvi(round(
-        forecast["daily"]["uv_index_clear_sky_max"][0])).translate(superscript)
-    current_date, current_time = forecast["current_weather"]["time"].split("T")
+            f'{round(forecast.hourly["temperature_2m"][i]):>3}' for i in
+            [day*24 + h for h in range(2, 23, 5)]).translate(SUPERSCRIPT)
+        yield [[(" ",), (markers[day], "dim")]]
+        yield [[("  ",), *condition_bar],
+               [(weekday, "dim"), (" ",)],
+               [(weather_symbol,)],
+               [(" ",), temperature(day, "min"), (" ",), ("/", "dim")],
+               [temperature(day, "max"), (" ",), ("°C", "dim")],
+               [(" ",), ("ᵁⱽ", "dim"),
+                (f"{uvi}".translate(SUBSCRIPT), uvi_style(uvi))],
+               [(f" {moon_symbol}",)]]
+        yield [[(f"  {temperatures}",)]]
+
+def detail_rows(forecast, series):
+    """Yield the lines of an hourly or 15-minutely view from now on.
+
+    Each day starts with a dim date line. Lines are lists of
+    (string, *styles) pieces.
+    """
+    now = forecast.current["time"]
+    start = max(0, bisect_right(series.time, now) - 1)
+    date = None
+    for i in range(start, len(series)):
+        day, time = series.time[i].split("T")
+        if day != date:
+            date = day
+            weekday = datetime.fromisoformat(day).strftime("%a")
+            yield [(f"{weekday} {day.translate(SUPERSCRIPT)}", "dim")]
+        symbol, style = represent_ww(series["weathercode"][i])
+        yield [(f" {time} ", "dim"),
+               (represent_wind(series["windspeed_10m"][i]), style),
+               (f" {symbol} ",),
+               (f"{format_temperature(series['temperature_2m'][i]):>3}",
+                *temperature_styles(series["temperature_2m"][i],
+                                    series["apparent_temperature"][i])),
+               (" ",), ("°C", "dim"),
+               (f"{round(series['windspeed_10m'][i]):>4} ",),
+               ("m/s", "dim")]
+
+def forecast_widths(forecast):
+    """Return the column widths of the daily forecast view.
+
+    The widths follow from the formats of forecast_rows, so that they are
+    known without building the rows.
+    """
+    daily = forecast.daily
+    days = range(len(daily))
+    first = datetime.fromisoformat(daily["time"][0]).replace(
+        tzinfo=ZoneInfo(forecast.timezone))
+    last = datetime.fromisoformat(daily["time"][-1]).replace(
+        tzinfo=ZoneInfo(forecast.timezone))
+    return [
+        # hour markers, condition bar and temperatures of 24 hours
+        max(1 + len(HOUR_MARKERS), 2 + 24, 2 + 5*3 + 4*2),
+        max(cell_len(datetime.fromisoformat(x).strftime("%a")) + 1
+            for x in daily["time"]),
+        max(cell_len(represent_ww(x)[0]) for x in daily["weathercode"]),
+        max(len(format_temperature(daily["temperature_2m_min"][day])) + 3
+            for day in days),
+        max(len(format_temperature(daily["temperature_2m_max"][day])) + 3
+            for day in days),
+        max(len(f"{round(x)}") + 3 for x in daily["uv_index_max"]),
+        3 if full_moon_between(first, datetime.combine(
+            last, last.time().max, last.tzinfo)) else 1,
+    ]
+
+def layout(console, forecast_table, details_table=None):
+    """Place the forecast and details side by side or stacked."""
+    if console.size.width < 80:
+        outer_table = Table.grid(padding=(1, 0), expand=True)
+        outer_table.add_column()
+        if details_table:
+            outer_table.add_row(details_table)
+        outer_table.add_row(forecast_table)
+    else:
+        outer_table = Table.grid(padding=(0, 2), expand=True)
+        outer_table.add_column(no_wrap=True)
+        outer_table.add_column()
+        outer_table.add_row(forecast_table, details_table)
+    return outer_table
+
+def output_chunks(forecast, toponym, console, backend="text",
+                  resolution="daily"):
+    """Yield the renderables of a forecast, to be printed in order.
+
+    The first holds the details, and in the daily view the days beside
+    them, which include the current hour. Later ones hold one day, or one
+    line of the hourly and 15-minutely views, and are built only when
+    requested.
+    """
+    # pylint: disable=too-many-locals
+    cell = {"text": to_text, "markup": to_markup}[backend]
+
+    sunrise = forecast.daily["sunrise"][0].split("T")[1]
+    sunset = forecast.daily["sunset"][0].split("T")[1]
+    current_date, current_time = forecast.current["time"].split("T")
     current_weather = represent_ww(
-        forecast["current_weather"]["weathercode"])[0]
-    current_temperature = represent_temperature(
-        forecast["current_weather"]["temperature"],
-        forecast["hourly"]["apparent_temperature"][
-            forecast["hourly"]["time"].index(
-                forecast["current_weather"]["time"][:-3] + ":00")])
+        forecast.current["weathercode"])[0]
+    current_temperature = (
+        format_temperature(forecast.current["temperature"]),
+        *temperature_styles(
+            forecast.current["temperature"],
+            forecast.hourly["apparent_temperature"][forecast.current_hour()]))
     details_table = Table.grid(expand=True)
     details_table.add_column(justify="right")
     toponym = toponym.rsplit(",", 1)
-    details_table.add_row(f"[toponym]{toponym[0]}[/]")
+    details_table.add_row(cell([(toponym[0], "toponym")]))
     if len(toponym) > 1:
-        details_table.add_row(f"[toponym][dim]{toponym[1]}[/][/]")
+        details_table.add_row(cell([(toponym[1], "toponym", "dim")]))
     details_table.add_row()
-    details_table.add_row(f"[sun]☉  {sunrise}–{sunset}[/]")
+    details_table.add_row(cell([(f"☉  {sunrise}–{sunset}", "sun")]))
     details_table.add_row(
-        f"[sun][dim]{current_date}[/][/]".translate(superscript))
+        cell([(current_date.translate(SUPERSCRIPT), "sun", "dim")]))
     details_table.add_row()
-    details_table.add_row(f"[dim]{current_time}[/]  {current_weather}  "
-                          f"{current_temperature} [dim]°C[/]")
+    details_table.add_row(cell([(current_time, "dim"),
+                                (f"  {current_weather}  ",),
+                                current_temperature,
+                                (" ",),
+                                ("°C", "dim")]))
+
+    if resolution != "daily":
+        series = forecast.hourly
+        if resolution == "15min":
+            if forecast.minutely is not None:
+                series = forecast.minutely
+            else:
+                logger.warning("No 15-minutely forecast, showing hourly")
+        yield details_table
+        for line in detail_rows(forecast, series):
+            yield cell(line)
+        return
 
-    console = Console(theme=custom_theme)
+    # Column widths are fixed up front, so that days can be printed one at
+    # a time and still line up.
+    widths = forecast_widths(forecast)
+    forecast_width = sum(widths) + len(widths) - 1
     if console.size.width < 80:
-        outer_table = Table.grid(padding=(1, 0), expand=True)
-        outer_table.add_column()
-        outer_table.add_row(details_table)
-        outer_table.add_row(forecast_table)
+        lines_beside_details = 0
     else:
-        outer_table = Table.grid(padding=(0, 2), expand=True)
-        outer_table.add_column(no_wrap=True)
-        outer_table.add_column()
-        outer_table.add_row(forecast_table, details_table)
-    console.print(outer_table)
+        lines_beside_details = len(console.render_lines(
+            details_table, console.options.update_width(
+                console.size.width - forecast_width - 2)))
+    rows = forecast_rows(forecast)
+    details = details_table
+    while True:
+        forecast_table = Table.grid(padding=(0, 1))
+        for (name, options), width in zip(FORECAST_COLUMNS, widths):
+            forecast_table.add_column(name, width=width, **options)
+        for row in islice(rows, 3*max(1, -(-lines_beside_details//3))):
+            forecast_table.add_row(*map(cell, row))
+        if not forecast_table.rows:
+            break
+        yield layout(console, forecast_table, details)
+        details, lines_beside_details = None, 0
+
+def output(forecast, toponym, console=None, backend="text",
+           resolution="daily"):
+    """Output a forecast.
+
+    The daily view shows every day of the forecast, and the "hourly" and
+    "15min" resolutions list conditions from now on. Rows are printed as
+    they are built, after the details that precede or sit beside them.
+
+    Table cells are built from (string, *styles) pieces, either as styled
+    text (backend="text") or as console markup that rich parses
+    (backend="markup"). Both backends produce identical output.
+    """
+    console = console or Console(theme=custom_theme)
+    for renderable in output_chunks(forecast, toponym, console, backend,
+                                    resolution):
+        console.print(renderable, highlight=False)
+
+def render_chunks(forecast, toponym, terminal, backend="text",
+                  resolution="daily"):
+    """Yield a forecast rendered for a described terminal, chunk by chunk.
+
+    The chunks are those of output_chunks, rendered when requested.
+    """
+    buffer = io.StringIO()
+    console = Console(file=buffer,
+                      theme=custom_theme,
+                      width=terminal["width"],
+                      force_terminal=terminal["is_terminal"],
+                      color_system=terminal["color_system"],
+                      no_color=terminal.get("no_color", False))
+    for renderable in output_chunks(forecast, toponym, console, backend,
+                                    resolution):
+        console.print(renderable, highlight=False)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def render(forecast, toponym, terminal, options=None, file=None):
+    """Render a forecast for a described terminal into a string.
+
+    The options backend and resolution are passed to render_chunks. The
+    rendering is also written to file as it is built, if given.
+    """
+    chunks = []
+    for chunk in render_chunks(forecast, toponym, terminal,
+                               **(options or {})):
+        chunks.append(chunk)
+        if file:
+            file.write(chunk)
+            file.flush()
+    return "".join(chunks)
+
+def output_summary(forecasts, toponyms, console=None):
+    """Output a compact one-line-per-location summary of forecasts."""
+    summary_table = Table.grid(padding=(0, 1))
+    summary_table.add_column("toponym", no_wrap=True)
+    summary_table.add_column("symbol")
+    summary_table.add_column("temperature", no_wrap=True, justify="right")
+    summary_table.add_column("min_temperature", no_wrap=True, justify="right")
+    summary_table.add_column("max_temperature", no_wrap=True, justify="right")
+    for forecast, toponym in zip(forecasts, toponyms):
+        current_weather = represent_ww(
+            forecast.current["weathercode"])[0]
+        current_temperature = represent_temperature(
+            forecast.current["temperature"],
+            forecast.hourly["apparent_temperature"][forecast.current_hour()])
+        min_temperature = represent_temperature(
+            forecast.daily["temperature_2m_min"][0],
+            forecast.daily["apparent_temperature_min"][0])
+        max_temperature = represent_temperature(
+            forecast.daily["temperature_2m_max"][0],
+            forecast.daily["apparent_temperature_max"][0])
+        summary_table.add_row(
+            f"[toponym]{toponym.split(',')[0]}[/]",
+            f"{current_weather}",
+            f"{current_temperature} [dim]°C[/]",
+            f" {min_temperature} [dim]/[/]",
+            f"{max_temperature} [dim]°C[/]")
+    console = console or Console(theme=custom_theme)
+    console.print(summary_table)
@@ -0,0 +1,3 @@
+"""Convenience imports."""
+
+from .spans import *
@@ -0,0 +1,121 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Timing spans and counters of a run.
+
+Spans and counters are recorded only while a profile is active, so the
+instrumentation costs a global lookup otherwise.
+"""
+
+import contextlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+class Profile:
+    """Wall-clock spans and named counters."""
+
+    def __init__(self, origin=None):
+        self.origin = origin or time.perf_counter()
+        self.spans = []  # (name, began, duration, depth, thread)
+        self.counters = Counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def record(self, name, began, end, depth=0):
+        """Record a span between perf_counter readings."""
+        with self.lock:
+            self.spans.append((name, began - self.origin, end - began, depth,
+                               threading.current_thread().name))
+
+    def to_dict(self) -> dict:
+        """Return spans in ms and counters."""
+        return {
+            "total_ms": round((time.perf_counter() - self.origin)*1000, 3),
+            "spans": [{"name": name,
+                       "start_ms": round(began*1000, 3),
+                       "duration_ms": round(duration*1000, 3),
+                       "depth": depth,
+                       "thread": thread}
+                      for name, began, duration, depth, thread
+                      in sorted(self.spans, key=lambda x: x[1])],
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def report(self) -> str:
+        """Return a human-readable breakdown."""
+        data = self.to_dict()
+        lines = [f"{'span':<32}{'start':>10}{'duration':>12}"]
+        for span_ in data["spans"]:
+            name = "  "*span_["depth"] + span_["name"]
+            thread = ("" if span_["thread"] == "MainThread"
+                      else f"  [{span_['thread']}]")
+            lines.append(f"{name:<32}{span_['start_ms']:>8.1f}ms"
+                         f"{span_['duration_ms']:>10.1f}ms{thread}")
+        lines.append(f"{'total':<32}{'':>10}{data['total_ms']:>10.1f}ms")
+        lines.extend(f"{name:<32}{value:>22}"
+                     for name, value in data["counters"].items())
+        return "\n".join(lines) + "\n"
+
+active = None  # pylint: disable=invalid-name
+
+def start(origin=None) -> Profile:
+    """Start recording into a new profile."""
+    global active  # pylint: disable=global-statement
+    active = Profile(origin)
+    return active
+
+def stop() -> Profile:
+    """Stop recording and return the profile."""
+    global active  # pylint: disable=global-statement
+    profile, active = active, None
+    return profile
+
+@contextlib.contextmanager
+def span(name):
+    """Time a block as a span of the active profile."""
+    if not (profile := active):
+        yield
+        return
+    depth = getattr(profile.local, "depth", 0)
+    profile.local.depth = depth + 1
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(name, begin, time.perf_counter(), depth)
+        profile.local.depth = depth
+
+def count(name, value=1):
+    """Add to a counter of the active profile."""
+    if profile := active:
+        with profile.lock:
+            profile.counters[name] += value
+
+@contextlib.contextmanager
+def cprofile(path):
+    """Profile a block with cProfile into a pstats file, if path is set."""
+    if not path:
+        yield
+        return
+    import cProfile  # pylint: disable=import-outside-toplevel
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info(f"Wrote {path}")
+
+def write_report(profile, fmt, file):
+    """Write a profile as text or JSON."""
+    if fmt == "json":
+        json.dump(profile.to_dict(), file)
+        file.write("\n")
+    else:
+        file.write(profile.report())
@@ -0,0 +1,17 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Protocol between the daemon and weathercat-client.
+
+A client sends one JSON line with its arguments and terminal description
+to the daemon's Unix domain socket. The daemon answers with
+{"output": chunk} lines as the output is printed, and a final
+{"status": status} line. Only the standard library and platformdirs are
+imported, as for the client.
+"""
+
+import platformdirs
+
+def socket_path():
+    """Return the path of the daemon's Unix domain socket."""
+    return platformdirs.user_runtime_path("weathercat") / "weathercat.sock"
@@ -0,0 +1,4 @@
+"""Convenience imports."""
+
+from .forecast import *
+from .registry import *
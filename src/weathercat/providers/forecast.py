@@ -0,0 +1,94 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Forecast data model."""
+
+import copy
+import hashlib
+import json
+from array import array
+
+def columnize(values: list):
+    """Pack numeric values into an array, leaving other values in a list."""
+    if all(isinstance(x, int) and not isinstance(x, bool) for x in values):
+        return array("l", values)
+    if all(isinstance(x, (int, float)) and not isinstance(x, bool)
+           for x in values):
+        return array("d", values)
+    return list(values)
+
+class Series:
+    """Columns of a time series with a timestamp → index map."""
+
+    __slots__ = ("time", "columns", "index")
+
+    def __init__(self, data: dict):
+        self.time = list(data["time"])
+        self.columns = {name: columnize(values)
+                        for name, values in data.items() if name != "time"}
+        self.index = {time: i for i, time in enumerate(self.time)}
+
+    def __getitem__(self, name):
+        if name == "time":
+            return self.time
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name == "time" or name in self.columns
+
+    def __len__(self):
+        return len(self.time)
+
+    def to_dict(self) -> dict:
+        """Return plain lists keyed by variable name."""
+        return {"time": self.time,
+                **{name: list(values) for name, values in self.columns.items()}}
+
+class Forecast:  # pylint: disable=too-many-instance-attributes
+    """Weather forecast for a single location.
+
+    Constructed from a provider response in the Open-Meteo format, with
+    current conditions, hourly and daily series, and optionally a
+    15-minutely series.
+    """
+
+    __slots__ = ("latitude", "longitude", "timezone", "current", "minutely",
+                 "hourly", "daily", "digest")
+
+    def __init__(self, data: dict):
+        self.digest = hashlib.sha1(json.dumps(data, sort_keys=True)
+                                   .encode("utf8")).hexdigest()
+        self.latitude = data["latitude"]
+        self.longitude = data["longitude"]
+        self.timezone = data["timezone"]
+        self.current = dict(data["current_weather"])
+        self.minutely = (Series(data["minutely_15"]) if "minutely_15" in data
+                         else None)
+        self.hourly = Series(data["hourly"])
+        self.daily = Series(data["daily"])
+
+    def current_hour(self) -> int:
+        """Return the hourly index of the current conditions."""
+        return self.hourly.index[self.current["time"][:-3] + ":00"]
+
+    def with_current(self, current: dict) -> "Forecast":
+        """Return a copy with other current conditions, sharing the series."""
+        forecast = copy.copy(self)
+        forecast.current = dict(current)
+        forecast.digest = hashlib.sha1(
+            (self.digest + json.dumps(current, sort_keys=True))
+            .encode("utf8")).hexdigest()
+        return forecast
+
+    def to_dict(self) -> dict:
+        """Return the forecast in the Open-Meteo format."""
+        return {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "timezone": self.timezone,
+            "current_weather": self.current,
+            "hourly": self.hourly.to_dict(),
+            "daily": self.daily.to_dict(),
+            **({"minutely_15": self.minutely.to_dict()}
+               if self.minutely is not None else {}),
+        }
@@ -1,38 +1,270 @@
 """Open-Meteo weather API wrapper."""
 
-from copy import deepcopy
-from statistics import mean
-import requests
+import contextlib
+import json
+import logging
+import time
+from array import array
+from collections import defaultdict
+from itertools import accumulate
+from operator import itemgetter
+from urllib.parse import quote
 from tzlocal import get_localzone_name
+from weathercat import history
+from weathercat.cache import FileCache
+from weathercat.network import TIMEOUT, get_session, rank_mirrors
+from weathercat.profiling import count, span
+from weathercat.providers.forecast import Forecast
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Open-Meteo updates its forecasts hourly, and current conditions every 15
+# minutes.
+MODEL_UPDATE_INTERVAL = 3600
+CURRENT_UPDATE_INTERVAL = 900
+
+# locations per bulk request
+BULK_SIZE = 50
+
+# forecasts kept in memory by long-running processes, keyed by payload
+loaded = {}
 
 def transform(data):
     """Replace daily conditions 0-3 with average hourly condition."""
     # Daily weathercode ≝ the most severe weather condition on a given day,
     # but it's questionable whether 3 is more severe than 0.
-    result = deepcopy(data)
+    # Daily sums are differences of hourly prefix sums, and only the
+    # replaced daily weathercode list is newly allocated.
+    hourly_codes = data["hourly"]["weathercode"]
+    prefix_sums = array("l", accumulate(hourly_codes, initial=0))
+    daily_codes = []
     for day, code in enumerate(data["daily"]["weathercode"]):
-        if code > 3:
-            continue
-        avg = round(mean(data["hourly"]["weathercode"][day*24:(day + 1)*24]))
-        result["daily"]["weathercode"][day] = avg
-    return result
-
-def get_forecast(latitude, longitude):
-    """Request weather forecast from Open-Meteo."""
-    base_url = "https://api.open-meteo.com/v1/forecast"
+        if code <= 3:
+            start, end = day*24, min((day + 1)*24, len(hourly_codes))
+            code = round((prefix_sums[end] - prefix_sums[start])
+                         / (end - start))
+        daily_codes.append(code)
+    return {**data, "daily": {**data["daily"], "weathercode": daily_codes}}
+
+def expiry(ttl, interval=MODEL_UPDATE_INTERVAL):
+    """Return the expiry time of a forecast fetched now.
+
+    Forecasts expire after ttl seconds or at the next update, every
+    interval seconds, whichever comes first.
+    """
+    now = time.time()
+    return min(now + ttl, now - now % interval + interval)
+
+def build_payload(latitude, longitude, days=7, minutely=False):
+    """Build a request payload for a single location.
+
+    The forecast covers days days, with 15-minutely conditions if minutely
+    is set.
+    """
     payload = {
-        "latitude": latitude,
-        "longitude": longitude,
+        # ~1 km, finer than the model grids
+        "latitude": round(latitude, 2),
+        "longitude": round(longitude, 2),
         "hourly": "temperature_2m,apparent_temperature,weathercode,"
                   "windspeed_10m",
         "daily": "weathercode,temperature_2m_max,temperature_2m_min,"
                  "apparent_temperature_max,apparent_temperature_min,"
                  "sunrise,sunset,uv_index_max,uv_index_clear_sky_max",
         "current_weather": "true",
+        "forecast_days": days,
         "windspeed_unit": "ms",
-        "timezone": requests.utils.quote((get_localzone_name() or "auto"),
-                                         safe=""),
+        "timezone": quote((get_localzone_name() or "auto"), safe=""),
+    }
+    if minutely:
+        payload["minutely_15"] = ("temperature_2m,apparent_temperature,"
+                                  "weathercode,windspeed_10m")
+    return payload
+
+def current_payload(payload):
+    """Reduce a forecast payload to a request for current conditions."""
+    return {k: payload[k] for k in ("latitude", "longitude", "current_weather",
+                                    "windspeed_unit", "timezone")}
+
+def record_forecast(payload, data, max_entries=64):
+    """Record a requested forecast, and cache its current conditions.
+
+    The current conditions of a forecast fetched just now are as fresh as
+    a separate request for them would be, so they replace cached ones.
+    """
+    history.record(payload["latitude"], payload["longitude"], data,
+                   time.time())
+    FileCache("current", max_entries).set(
+        current_payload(payload), data["current_weather"],
+        expires=expiry(CURRENT_UPDATE_INTERVAL, CURRENT_UPDATE_INTERVAL))
+
+def request_forecasts(payloads, base_url=BASE_URL):
+    """Request forecasts for multiple locations in a single request.
+
+    The payloads must differ only by coordinates. Raise ConnectionError
+    unless there is a forecast for each.
+    """
+    payload = {
+        **payloads[0],
+        "latitude": ",".join(str(x["latitude"]) for x in payloads),
+        "longitude": ",".join(str(x["longitude"]) for x in payloads),
     }
     payload_str = "&".join(f"{k}={v}" for k, v in payload.items())
-    response = requests.get(base_url, params=payload_str, timeout=5)
-    return transform(response.json())
+    with span("open-meteo request"):
+        response = get_session().get(base_url, params=payload_str,
+                                     timeout=TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+    data = data if isinstance(data, list) else [data]
+    if len(data) != len(payloads):
+        raise ConnectionError(f"{base_url} returned {len(data)} forecasts "
+                              f"for {len(payloads)} locations")
+    return data
+
+def request_from_mirrors(payloads, mirrors):
+    """Request forecasts from the first responding mirror."""
+    for i, url in enumerate(mirrors):
+        try:
+            return request_forecasts(payloads, url)
+        except OSError as exc:  # requests exceptions included
+            if i == len(mirrors) - 1:
+                raise
+            logger.warning(f"{url} failed: {exc}")
+    return []
+
+def read_cached(cache, payload, key, load=Forecast):
+    """Return a forecast from memory or disk, or None."""
+    if key in loaded and loaded[key][0] > time.time():
+        count("cache.memory.hit")
+        return loaded[key][1]
+    if entry := cache.get_entry(payload):
+        forecast = load(entry["value"])
+        loaded[key] = entry["expires"], forecast
+        return forecast
+    return None
+
+# kinds of cached responses: kept in namespace as prepare(response) until
+# the next update every interval seconds, read with load, and passed to
+# on_fetch(payload, data, max_entries) unless it is None
+FORECASTS = {"namespace": "forecasts", "prepare": transform, "load": Forecast,
+             "interval": MODEL_UPDATE_INTERVAL, "on_fetch": record_forecast}
+CURRENT = {"namespace": "current", "prepare": itemgetter("current_weather"),
+           "load": dict, "interval": CURRENT_UPDATE_INTERVAL, "on_fetch": None}
+
+def bulk_chunks(payloads, indices):
+    """Group payload indices into bulk requests with the same options."""
+    groups = defaultdict(list)
+    for i in indices:
+        options = {k: v for k, v in payloads[i].items()
+                   if k not in ("latitude", "longitude")}
+        groups[json.dumps(options, sort_keys=True)].append(i)
+    return [group[i:i + BULK_SIZE] for group in groups.values()
+            for i in range(0, len(group), BULK_SIZE)]
+
+def fetch_chunks(payloads, chunks, urls, cache, kind):
+    """Request chunks of payloads in bulk, yielding (index, data) pairs."""
+    for chunk in chunks:
+        for i, item in zip(chunk, request_from_mirrors(
+                [payloads[i] for i in chunk], urls)):
+            data = kind["prepare"](item)
+            if kind["on_fetch"]:
+                kind["on_fetch"](payloads[i], data, cache.max_entries)
+            yield i, data
+
+def fetch_payloads(payloads, options=None, kind=None):
+    """Request weather forecasts for payloads, or read them from cache.
+
+    Forecasts are looked up in memory, then on disk. Cache misses are
+    locked, so that of concurrent processes only one requests a location
+    while the others wait for its result, and then requested in bulk,
+    BULK_SIZE locations with the same options at a time, from the base_url
+    option or the mirror with the fastest connection. Responses are cached
+    for the ttl option as kind, FORECASTS by default, describes.
+    """
+    options, kind = options or {}, kind or FORECASTS
+    ttl = options.get("ttl", kind["interval"])
+    cache = FileCache(kind["namespace"],
+                      max_entries=max(options.get("max_entries", 64),
+                                      len(payloads)))
+    keys = [json.dumps(x, sort_keys=True) for x in payloads]
+    forecasts = [None]*len(payloads)
+    if ttl > 0:
+        forecasts = [read_cached(cache, payload, key, kind["load"])
+                     for payload, key in zip(payloads, keys)]
+    with contextlib.ExitStack() as locks:
+        if ttl > 0:
+            # in a consistent order, so that bulk requests can't deadlock
+            for i in sorted((i for i, x in enumerate(forecasts) if not x),
+                            key=lambda i: keys[i]):
+                locks.enter_context(cache.lock(payloads[i]))
+                # filled by another process while waiting
+                forecasts[i] = read_cached(cache, payloads[i], keys[i],
+                                           kind["load"])
+        chunks = bulk_chunks(payloads,
+                             [i for i, x in enumerate(forecasts) if not x])
+        urls = (rank_mirrors([options.get("base_url", BASE_URL),
+                              *options.get("mirrors", ())])
+                if chunks else [])
+        for i, data in fetch_chunks(payloads, chunks, urls, cache, kind):
+            forecasts[i] = kind["load"](data)
+            if ttl > 0:
+                expires = expiry(ttl, kind["interval"])
+                cache.set(payloads[i], data, expires=expires)
+                loaded[keys[i]] = expires, forecasts[i]
+    return forecasts
+
+def fetch_current(payloads, options=None):
+    """Request current conditions for payloads, or read them from cache.
+
+    The requests carry only current_weather, a small fraction of a full
+    forecast, and are cached until the next quarter hour.
+    """
+    return fetch_payloads([current_payload(x) for x in payloads], options,
+                          CURRENT)
+
+def refresh_current(forecasts, payloads, options=None):
+    """Merge fresher current conditions into forecasts.
+
+    Current conditions are refreshed separately from the forecasts, which
+    change only with model updates. The forecasts are kept as they are if
+    the refresh fails, e.g. offline.
+    """
+    try:
+        currents = fetch_current(payloads, options)
+    except OSError as exc:  # requests exceptions included
+        logger.warning(f"Refreshing current conditions failed: {exc}")
+        return forecasts
+    return [forecast.with_current(current)
+            if current["time"] > forecast.current["time"] else forecast
+            for forecast, current in zip(forecasts, currents)]
+
+def current_options(options):
+    """Return fetch options for current conditions, cached for current_ttl."""
+    return {**options,
+            "ttl": options.get("current_ttl", CURRENT_UPDATE_INTERVAL)}
+
+def get_forecasts(coordinates, days=7, minutely=False, **options):
+    """Request weather forecasts for multiple locations, or read from cache.
+
+    The options ttl, max_entries, base_url and mirrors are passed to
+    fetch_payloads. Current conditions of cached forecasts are refreshed
+    after the current_ttl option or the next quarter hour, unless
+    current_ttl is 0.
+    """
+    payloads = [build_payload(latitude, longitude, days, minutely)
+                for latitude, longitude in coordinates]
+    forecasts = fetch_payloads(payloads, options)
+    refreshing = options.get("current_ttl", CURRENT_UPDATE_INTERVAL) > 0
+    if options.get("ttl", MODEL_UPDATE_INTERVAL) > 0 and refreshing:
+        return refresh_current(forecasts, payloads, current_options(options))
+    return forecasts
+
+def get_current_weather(latitude, longitude, **options):
+    """Request only the current conditions from Open-Meteo, or from cache."""
+    return fetch_current([build_payload(latitude, longitude)],
+                         current_options(options))[0]
+
+def get_forecast(latitude, longitude, **options):
+    """Request weather forecast from Open-Meteo, or read it from cache."""
+    return get_forecasts([(latitude, longitude)], **options)[0]
@@ -0,0 +1,66 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Weather provider registry.
+
+A provider is a module with a get_forecasts function that takes a list of
+(latitude, longitude) pairs and keyword options, and returns a Forecast per
+location. Every provider accepts the common options ttl, max_entries, days
+and minutely, and ignores those it has no use for. A provider may also have a
+get_current_weather function for requesting only the current conditions.
+Provider modules are imported on first use.
+"""
+
+import importlib
+import logging
+from weathercat.profiling import span
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = {
+    "open-meteo": "weathercat.providers.open_meteo",
+    "file": "weathercat.providers.snapshot",
+}
+
+DEFAULT_PROVIDER = "open-meteo"
+
+def register_provider(name: str, module: str):
+    """Register a provider module by its import name."""
+    PROVIDERS[name] = module
+
+def load_provider(name: str):
+    """Import a registered provider module.
+
+    Raise LookupError for unknown providers.
+    """
+    if name not in PROVIDERS:
+        raise LookupError(f"Unknown provider: {name}")
+    return importlib.import_module(PROVIDERS[name])
+
+def configured_provider(conf: dict) -> tuple[str, dict]:
+    """Return the provider name and options selected by configuration."""
+    options = dict(conf.get("provider", {}))
+    return options.pop("name", DEFAULT_PROVIDER), options
+
+def get_forecasts(coordinates, provider=DEFAULT_PROVIDER, **options):
+    """Request weather forecasts for multiple locations from a provider."""
+    logger.debug(f"Using provider {provider}")
+    with span(f"forecast ({provider})"):
+        return load_provider(provider).get_forecasts(coordinates, **options)
+
+def get_forecast(latitude, longitude, provider=DEFAULT_PROVIDER, **options):
+    """Request weather forecast for a single location from a provider."""
+    return get_forecasts([(latitude, longitude)], provider, **options)[0]
+
+def get_current_weather(latitude, longitude, provider=DEFAULT_PROVIDER,
+                        **options) -> dict:
+    """Request the current conditions for a location from a provider.
+
+    Providers without get_current_weather serve those of a full forecast.
+    """
+    module = load_provider(provider)
+    with span(f"current weather ({provider})"):
+        if hasattr(module, "get_current_weather"):
+            return module.get_current_weather(latitude, longitude, **options)
+        return module.get_forecasts([(latitude, longitude)],
+                                    **options)[0].current
@@ -0,0 +1,51 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Forecasts read from a saved Open-Meteo response.
+
+The file holds a response to a single or a bulk request as JSON or as a
+Python literal, like tests/forecast.txt. Locations are served the saved
+forecasts in turn.
+"""
+
+import ast
+import functools
+import json
+import logging
+from itertools import cycle
+from weathercat.providers.forecast import Forecast
+from weathercat.providers.open_meteo import transform
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=8)
+def load_snapshot(path: str) -> list:
+    """Read saved responses as a list."""
+    logger.debug(f"Reading {path}")
+    with open(path, encoding="utf8") as file_object:
+        text = file_object.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = ast.literal_eval(text)
+    return data if isinstance(data, list) else [data]
+
+def truncate(data: dict, days: int) -> dict:
+    """Limit a response to a horizon of days."""
+    if len(data["daily"]["time"]) <= days:
+        return data
+    steps = {"daily": days, "hourly": days*24, "minutely_15": days*96}
+    return {**data, **{series: {name: values[:step]
+                                for name, values in data[series].items()}
+                       for series, step in steps.items() if series in data}}
+
+def get_forecasts(coordinates, path=None, days=7, **_options):
+    """Return saved forecasts for locations.
+
+    Raise LookupError without a path.
+    """
+    if not path:
+        raise LookupError("The file provider needs a path")
+    responses = cycle(load_snapshot(path))
+    return [Forecast(transform(truncate(next(responses), days)))
+            for _coordinates in coordinates]
@@ -0,0 +1,205 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Local stand-in for the Open-Meteo forecast API.
+
+Serves deterministic synthetic forecasts in the Open-Meteo format, for load
+testing and benchmarking without network access. Single and bulk requests,
+forecast_days, minutely_15, current_weather and gzip are supported. Run
+with `python -m weathercat.providers.standin [--port PORT] [--latency S]`
+and point provider.base_url at the printed URL.
+"""
+
+from __future__ import annotations
+import argparse
+import gzip
+import json
+import logging
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger(__name__)
+
+PATH = "/v1/forecast"
+
+CODES = [0, 1, 2, 3, 45, 51, 61, 63, 71, 80, 95]
+
+def synthesize_series(rng, times, hours_per_step):
+    """Synthesize conditions at times."""
+    temperatures = [12 + 8*math.sin((i*hours_per_step % 24 - 9)/24*2*math.pi)
+                    + rng.uniform(-1, 1) for i in range(len(times))]
+    return {
+        "time": times,
+        "temperature_2m": [round(x, 1) for x in temperatures],
+        "apparent_temperature": [round(x + rng.uniform(-6, 3), 1)
+                                 for x in temperatures],
+        "weathercode": [rng.choice(CODES) for _ in times],
+        "windspeed_10m": [round(rng.uniform(0, 15), 1) for _ in times],
+    }
+
+def synthesize(latitude: float, longitude: float, timezone: str,
+               days: int = 7) -> dict:
+    """Synthesize a full forecast for a location."""
+    try:
+        zone = ZoneInfo(timezone)
+    except (ValueError, ZoneInfoNotFoundError):
+        timezone, zone = "GMT", ZoneInfo("UTC")
+    now = datetime.now(zone)
+    rng = random.Random(f"{latitude},{longitude},{now:%Y-%m-%dT%H}")
+    midnight = datetime.combine(now.date(), datetime.min.time())
+    def times(minutes, count):
+        return [(midnight + timedelta(minutes=minutes*i)).strftime(
+            "%Y-%m-%dT%H:%M") for i in range(count)]
+    hourly = synthesize_series(rng, times(60, days*24), 1)
+    minutely = synthesize_series(rng, times(15, days*96), 0.25)
+    dates = [(midnight + timedelta(days=i)).strftime("%Y-%m-%d")
+             for i in range(days)]
+    def per_day(name):
+        return [hourly[name][i*24:(i + 1)*24] for i in range(days)]
+    uv_index = [round(rng.uniform(0, 8), 2) for _ in dates]
+    daily = {
+        "time": dates,
+        "weathercode": [x[12] for x in per_day("weathercode")],
+        "temperature_2m_max": [max(x) for x in per_day("temperature_2m")],
+        "temperature_2m_min": [min(x) for x in per_day("temperature_2m")],
+        "apparent_temperature_max": [max(x) for x
+                                     in per_day("apparent_temperature")],
+        "apparent_temperature_min": [min(x) for x
+                                     in per_day("apparent_temperature")],
+        "sunrise": [f"{x}T04:30" for x in dates],
+        "sunset": [f"{x}T21:30" for x in dates],
+        "uv_index_max": uv_index,
+        "uv_index_clear_sky_max": [round(x*1.2, 2) for x in uv_index],
+    }
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "generationtime_ms": 0.0,
+        "utc_offset_seconds": round(now.utcoffset().total_seconds()),
+        "timezone": timezone,
+        "timezone_abbreviation": now.tzname(),
+        "elevation": 0.0,
+        "current_weather": {
+            "temperature": hourly["temperature_2m"][now.hour],
+            "windspeed": hourly["windspeed_10m"][now.hour],
+            "winddirection": round(rng.uniform(0, 360)),
+            "weathercode": hourly["weathercode"][now.hour],
+            "is_day": int(6 <= now.hour < 22),
+            "time": hourly["time"][now.hour],
+        },
+        "hourly": hourly,
+        "daily": daily,
+        "minutely_15": minutely,
+    }
+
+def select(forecast: dict, params: dict) -> dict:
+    """Keep the series and variables requested by query parameters."""
+    result = {k: v for k, v in forecast.items()
+              if k not in ("current_weather", "hourly", "daily",
+                           "minutely_15")}
+    if params.get("current_weather") == "true":
+        result["current_weather"] = forecast["current_weather"]
+    for series in ("minutely_15", "hourly", "daily"):
+        if series not in params:
+            continue
+        names = params[series].split(",")
+        if unknown := [x for x in names if x not in forecast[series]]:
+            raise ValueError(f"Cannot initialize {series} variables "
+                             f"{', '.join(unknown)}")
+        result[series] = {x: forecast[series][x] for x in ["time", *names]}
+    return result
+
+def respond(query: str) -> list | dict:
+    """Answer a forecast query string."""
+    params = {k: v[0] for k, v in parse_qs(query).items()}
+    latitudes = [float(x) for x in params["latitude"].split(",")]
+    longitudes = [float(x) for x in params["longitude"].split(",")]
+    if len(latitudes) != len(longitudes):
+        raise ValueError("Latitude and longitude must have the same number "
+                         "of elements")
+    days = int(params.get("forecast_days", 7))
+    if not 1 <= days <= 16:
+        raise ValueError("Parameter 'forecast_days' must be between 1 and 16")
+    data = [select(synthesize(latitude, longitude,
+                              params.get("timezone", "GMT"), days), params)
+            for latitude, longitude in zip(latitudes, longitudes)]
+    return data if len(data) > 1 else data[0]
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Answer Open-Meteo forecast requests."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve a forecast or an error."""
+        url = urlsplit(self.path)
+        if url.path != PATH:
+            self.send_json(404, {"error": True, "reason": "Not Found"})
+            return
+        try:
+            data = respond(url.query)
+        except (KeyError, ValueError) as exc:
+            self.send_json(400, {"error": True, "reason": str(exc)})
+            return
+        time.sleep(self.server.latency)
+        self.send_json(200, data)
+
+    def send_json(self, status, data):
+        """Send a JSON response, gzipped if accepted."""
+        body = json.dumps(data).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+class Server(ThreadingHTTPServer):
+    """Threaded stand-in server with a simulated latency."""
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0):
+        self.latency = latency
+        super().__init__(address, RequestHandler)
+
+    @property
+    def base_url(self):
+        """Return the forecast endpoint URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{PATH}"
+
+def start(address=("127.0.0.1", 0), latency=0.0) -> Server:
+    """Start a stand-in server in a background thread."""
+    server = Server(address, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    """Execute."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds to delay each response")
+    args = parser.parse_args()
+    with Server((args.host, args.port), args.latency) as server:
+        print(f"Serving {server.base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -5,35 +5,220 @@
 
 import locale
 import logging
+import queue
 import sys
-from weathercat import __version__
+import time
+from functools import partial
+from weathercat import history, profiling
+from weathercat.cache import FileCache, end_of_hour, render_key
 from weathercat.config import parse_arguments, parse_config_file, setup_logging
-from weathercat.geolocation import geolocate, georesolve
-from weathercat.providers.open_meteo import get_forecast
-from weathercat.output import output
+from weathercat.formats import format_forecasts
+from weathercat.geolocation import geolocate, georesolve, parse_coordinates
+from weathercat.profiling import cprofile, span
+from weathercat.providers import (configured_provider, get_forecast,
+                                  get_forecasts)
+from weathercat.terminal import describe_terminal
+from weathercat.threads import spawn
+
+# weathercat.output is imported on demand, as rich is slow to import
+# pylint: disable=import-outside-toplevel
 
 logger = logging.getLogger(__name__)
 
-def main():
-    """Execute."""
-    args = parse_arguments()
-    setup_logging(args.loglevel)
-    logger.debug(f"{__version__ = }")
-    conf = parse_config_file()
-    locale.setlocale(locale.LC_ALL, conf.get("locale", ""))
+# seconds for fetching the forecast and the toponym
+DEADLINE = 10
 
-    if args.location:
+def fetch_concurrently(forecast_job, georesolve_job=None):
+    """Run forecast and reverse geocoding jobs within an overall deadline.
+
+    Jobs run in daemon threads, so that a hung job can't delay exit.
+    Failure or timeout of the reverse geocoding job yields None instead of
+    an exception, and timeout of the forecast job raises ConnectionError.
+    """
+    deadline = time.monotonic() + DEADLINE
+    jobs = {"forecast": forecast_job}
+    if georesolve_job:
+        jobs["georesolve"] = georesolve_job
+    results = spawn(jobs)
+    finished = {}
+    while len(finished) < len(jobs):
         try:
-            toponym, ϕ, λ = georesolve(" ".join(args.location))
-        except LookupError as exc:
-            print(exc)
-            sys.exit(1)
+            name, value = results.get(
+                timeout=max(0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        finished[name] = value
+    if "forecast" not in finished:
+        raise ConnectionError("Forecast request timeout")
+    if isinstance(finished["forecast"], Exception):
+        raise finished["forecast"]
+    resolved = finished.get("georesolve")
+    if georesolve_job and "georesolve" not in finished:
+        logger.warning("Reverse geocoding timeout")
+    elif isinstance(resolved, Exception):
+        logger.warning(f"Reverse geocoding failed: {resolved}")
+        resolved = None
+    return finished["forecast"], resolved
+
+def read_batch_locations(source, conf, stdin=None):
+    """Read batch locations from a file, stdin or the configuration."""
+    if source == "-":
+        lines = (stdin or sys.stdin).readlines()
+    elif source:
+        with open(source, encoding="utf8") as file_object:
+            lines = file_object.readlines()
+    else:
+        lines = conf.get("batch_locations", [])
+    return [line.strip() for line in lines
+            if line.strip() and not line.startswith("#")]
+
+def forecast_options(args, conf):
+    """Return forecast options selected by arguments and configuration."""
+    provider, options = configured_provider(conf)
+    return {"provider": provider,
+            **conf.get("forecast_cache", {}),
+            **options,
+            "days": args.days,
+            "minutely": args.resolution == "15min"}
+
+def write_formatted(forecasts, toponyms, args, console=None, batch=False):
+    """Write forecasts in a machine-readable format."""
+    text = format_forecasts(forecasts, toponyms,
+                            {"format": args.format, "fields": args.fields,
+                             "template": args.template}, batch)
+    if console:
+        console.out(text, highlight=False, end="")
+    else:
+        sys.stdout.write(text)
+
+def run_batch(locations, conf, geocoding, args, console=None):
+    """Forecast multiple locations using bulk requests."""
+    resolved = []
+    for location in locations:
+        try:
+            resolved.append(georesolve(location, **geocoding))
+        except (LookupError, ConnectionError) as exc:
+            logger.warning(exc)
+    toponyms = [toponym for toponym, _ϕ, _λ in resolved]
+    forecasts = get_forecasts([(ϕ, λ) for _toponym, ϕ, λ in resolved],
+                              **forecast_options(args, conf))
+    if args.format != "rich":
+        write_formatted(forecasts, toponyms, args, console, batch=True)
+        return
+    from weathercat.output import output, output_summary
+    if args.summary:
+        output_summary(forecasts, toponyms, console)
+        return
+    for forecast, toponym in zip(forecasts, toponyms):
+        output(forecast, toponym, console, resolution=args.resolution)
+
+def render_live(forecast, toponym, args, console):
+    """Render a forecast to a console."""
+    with span("render"), cprofile(args.profile_render):
+        from weathercat.output import output
+        output(forecast, toponym, console, resolution=args.resolution)
+
+def render_cached(forecast, toponym, args):
+    """Write a forecast rendered for this terminal, from cache if possible.
+
+    Cache misses are written as they are rendered, and cached until the end
+    of the hour.
+    """
+    terminal = describe_terminal()
+    key = render_key(forecast, toponym, terminal, args.resolution)
+    renders = FileCache("renders", max_entries=32)
+    if (rendered := renders.get(key)) is None:
+        with span("render"), cprofile(args.profile_render):
+            from weathercat.output import render
+            rendered = render(forecast, toponym, terminal,
+                              {"resolution": args.resolution}, sys.stdout)
+        renders.set(key, rendered, expires=end_of_hour())
+        return
+    with span("write"):
+        sys.stdout.write(rendered)
+
+def run(args, conf, console=None, stdin=None):
+    """Forecast and output locations selected by arguments and configuration.
+
+    Raise LookupError for unknown locations.
+    """
+    geocoding = dict(conf.get("geocoding_cache", {}))
+    geolocation = dict(conf.get("geolocation", {}))
+    if args.offline:
+        geocoding["offline"] = geolocation["offline"] = True
+    if args.batch is not None:
+        run_batch(read_batch_locations(args.batch, conf, stdin), conf,
+                  geocoding, args, console)
+        return
+
+    query = None  # reverse geocoding query
+    toponym = "Reverse geocoding unavailable"  # unless resolved
+    if args.location:
+        query = " ".join(args.location)
+        if coordinates := parse_coordinates(query):
+            ϕ, λ = coordinates
+        else:
+            toponym, ϕ, λ = georesolve(query, **geocoding)
+            query = None
     elif "default_location" in conf and not args.autolocate:
         toponym, ϕ, λ = [conf["default_location"][x]
                          for x in ["name", "latitude", "longitude"]]
     else:
-        toponym, ϕ, λ = georesolve(" ".join(str(x) for x in geolocate()))
-    logger.debug(f"{toponym = }, {ϕ = }, {λ = }")
+        ϕ, λ = geolocate(**geolocation)
+        query = f"{ϕ} {λ}"
+    logger.debug(f"{ϕ = }, {λ = }")
+
+    with span("fetch"):
+        forecast, resolved = fetch_concurrently(
+            partial(get_forecast, ϕ, λ, **forecast_options(args, conf)),
+            partial(georesolve, query, **geocoding) if query else None)
+    if resolved:
+        toponym = resolved[0]
+    logger.debug(f"{toponym = }")
+    if args.watch and not console:
+        from weathercat.watch import Screen, watch
+        watch(forecast, Screen(sys.stdout, toponym, args.resolution), (ϕ, λ),
+              forecast_options(args, conf))
+        return
+    if args.format != "rich":
+        write_formatted([forecast], [toponym], args, console)
+        return
+    if console:
+        render_live(forecast, toponym, args, console)
+    else:
+        render_cached(forecast, toponym, args)
 
-    forecast = get_forecast(ϕ, λ)
-    output(forecast, toponym)
+def main():
+    """Execute."""
+    start = time.perf_counter()
+    args = parse_arguments()
+    if args.profile:
+        profiling.start(origin=start).record("arguments", start,
+                                             time.perf_counter())
+    with span("logging"):
+        setup_logging(args.loglevel, rich=args.format == "rich")
+    if logger.isEnabledFor(logging.DEBUG):
+        from weathercat import __version__
+        logger.debug(f"{__version__ = }")
+    with span("config"):
+        conf = parse_config_file()
+        locale.setlocale(locale.LC_ALL, conf.get("locale", ""))
+    if conf.get("history", {}).get("enabled"):
+        history.start(conf["history"].get("path"))
+
+    if args.daemon:
+        from weathercat.daemon import serve
+        try:
+            serve(conf, run)
+        except RuntimeError as exc:  # already running
+            print(exc)
+            sys.exit(1)
+        return
+    try:
+        run(args, conf)
+    except (LookupError, ConnectionError) as exc:
+        print(exc)
+        sys.exit(1)
+    finally:
+        if args.profile:
+            profiling.write_report(profiling.stop(), args.profile, sys.stderr)
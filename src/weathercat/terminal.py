@@ -0,0 +1,42 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Terminal description for rendering.
+
+Only the standard library is imported, so that the thin client can
+describe its terminal to the daemon without importing the renderer.
+"""
+
+import os
+import sys
+
+# color systems by the last part of TERM, as rich detects them
+TERM_COLORS = {"kitty": "256", "256color": "256", "16color": "standard"}
+
+def describe_terminal():
+    """Describe the terminal to render for, as rich would detect it.
+
+    NO_COLOR drops colors but keeps other styles, such as reverse and dim.
+    """
+    width = None
+    if (columns := os.environ.get("COLUMNS", "").strip()).isdigit():
+        width = int(columns)
+    for stream in (sys.stdout, sys.stdin, sys.stderr):
+        if width:
+            break
+        try:
+            width = os.get_terminal_size(stream.fileno()).columns
+        except (AttributeError, OSError, ValueError):
+            pass
+    is_terminal = sys.stdout.isatty() or "FORCE_COLOR" in os.environ
+    term = os.environ.get("TERM", "").strip().lower()
+    if not is_terminal or term in ("dumb", "unknown"):
+        color_system = None
+    elif os.environ.get("COLORTERM", "").strip().lower() in ("truecolor",
+                                                             "24bit"):
+        color_system = "truecolor"
+    else:
+        color_system = TERM_COLORS.get(term.rpartition("-")[2], "standard")
+    return {"width": width or 80, "is_terminal": is_terminal,
+            "color_system": color_system,
+            "no_color": os.environ.get("NO_COLOR", "") != ""}
@@ -0,0 +1,24 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Background jobs."""
+
+import queue
+import threading
+
+def spawn(sources: dict) -> queue.SimpleQueue:
+    """Run sources in daemon threads, queueing their results.
+
+    Results are (name, value) pairs, where value is the return value or the
+    raised exception. Daemon threads never delay exit, so a hung source can
+    simply be abandoned.
+    """
+    results = queue.SimpleQueue()
+    def run(name, source):
+        try:
+            results.put((name, source()))
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            results.put((name, exc))
+    for name, source in sources.items():
+        threading.Thread(target=run, args=(name, source), daemon=True).start()
+    return results
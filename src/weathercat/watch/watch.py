@@ -0,0 +1,122 @@
+# Copyright 2023 Okko Hartikainen <okko.hartikainen@yandex.com>
+# This work is licensed under the GNU GPLv3. See COPYING.
+
+"""Live forecast in a terminal.
+
+The forecast is redrawn in place when its rendering changes: the hour
+marker moves on hour boundaries, the current conditions are refreshed
+every quarter hour with a small request, and the full forecast is
+refetched after model updates. Only changed lines are rewritten, and when
+only the current conditions change, the days below them are not rendered
+again.
+"""
+
+import logging
+import shutil
+import signal
+import threading
+import time
+from weathercat.cache import end_of_hour, render_key
+from weathercat.output import render_chunks
+from weathercat.providers import get_current_weather, get_forecast
+from weathercat.providers.open_meteo import CURRENT_UPDATE_INTERVAL
+from weathercat.terminal import describe_terminal
+
+logger = logging.getLogger(__name__)
+
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
+def redraw(previous: list, lines: list, file) -> list:
+    """Rewrite lines that differ from previous lines in place.
+
+    The cursor is left below the last line, and anything below it, such as
+    log messages, is cleared.
+    """
+    changes = [f"\x1b[{row + 1};1H{line}\x1b[K"
+               for row, line in enumerate(lines)
+               if row >= len(previous) or line != previous[row]]
+    changes.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+    file.write("".join(changes))
+    file.flush()
+    return lines
+
+def next_update(now: float) -> float:
+    """Return the Unix time of the next current conditions update."""
+    return now - now % CURRENT_UPDATE_INTERVAL + CURRENT_UPDATE_INTERVAL
+
+def shares_series(forecast, shown) -> bool:
+    """Test whether forecasts differ at most by their current conditions."""
+    return (shown is not None and forecast.daily is shown.daily
+            and forecast.hourly is shown.hourly)
+
+def refresh(forecast, coordinates, options, full: bool):
+    """Refetch the full forecast, or only the current conditions."""
+    try:
+        if full:
+            return get_forecast(*coordinates, **options)
+        return forecast.with_current(get_current_weather(*coordinates,
+                                                         **options))
+    except (OSError, ValueError, KeyError) as exc:  # requests included
+        logger.warning(f"Refresh failed: {exc}")
+        return forecast
+
+class Screen:
+    """Forecast rendering on the screen, as chunks and lines."""
+
+    def __init__(self, file, toponym: str, resolution: str = "daily"):
+        self.file = file
+        self.toponym = toponym
+        self.resolution = resolution
+        self.lines, self.chunks, self.key, self.shown = [], [], [], None
+
+    def clear(self):
+        """Clear the screen, so that the next forecast is drawn in full."""
+        self.file.write(CLEAR_SCREEN)
+        self.lines, self.key, self.shown = [], [], None
+
+    def show(self, forecast, terminal: dict):
+        """Redraw the lines of a forecast that differ from those shown."""
+        key = render_key(forecast, self.toponym, terminal, self.resolution)
+        if key == self.key:
+            return
+        rendered = render_chunks(forecast, self.toponym, terminal,
+                                 resolution=self.resolution)
+        # only the first chunk of the daily view shows current conditions,
+        # and the keys differ only by the digest first
+        if (self.resolution == "daily" and key[1:] == self.key[1:]
+                and shares_series(forecast, self.shown)):
+            self.chunks = [next(rendered), *self.chunks[1:]]
+        else:
+            self.chunks = list(rendered)
+        self.key, self.shown = key, forecast
+        height = shutil.get_terminal_size().lines
+        self.lines = redraw(self.lines,
+                            "".join(self.chunks).splitlines()[:height - 1],
+                            self.file)
+
+def watch(forecast, screen: Screen, coordinates: tuple, options: dict):
+    """Keep a forecast on the screen up to date until interrupted."""
+    file = screen.file
+    resized = threading.Event()
+    previous_handler = signal.signal(signal.SIGWINCH,
+                                     lambda *_args: resized.set())
+    file.write(HIDE_CURSOR + CLEAR_SCREEN)
+    try:
+        while True:
+            if resized.is_set():
+                resized.clear()
+                screen.clear()
+            screen.show(forecast, describe_terminal())
+            now, hour_end = time.time(), end_of_hour()
+            if resized.wait(min(hour_end, next_update(now)) - now):
+                continue
+            forecast = refresh(forecast, coordinates, options,
+                               full=time.time() >= hour_end - 1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGWINCH, previous_handler or signal.SIG_DFL)
+        file.write(SHOW_CURSOR)
+        file.flush()
@@ -1,5 +1,7 @@
 """Configurations."""
 
+import ast
+import pathlib
 import socket
 import pytest
 from test_output import print_saved_forecast
@@ -11,6 +13,25 @@ def no_network(monkeypatch):
         raise socket.gaierror("mocked")
     monkeypatch.setattr("socket.socket", socket_mock)
 
+@pytest.fixture(autouse=True)
+def cache_directory(monkeypatch, tmp_path):
+    """Isolate the user cache directory, in-memory cache and gazetteer.
+
+    Other user data, such as the DE421 ephemeris, is left where it is.
+    """
+    monkeypatch.setattr("weathercat.providers.open_meteo.loaded", {})
+    monkeypatch.setattr("weathercat.geolocation.gazetteer.opened", {})
+    monkeypatch.setattr("weathercat.geolocation.gazetteer.gazetteer_file",
+                        lambda: tmp_path / "data" / "gazetteer.bin")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    return tmp_path / "cache" / "weathercat"
+
+@pytest.fixture
+def forecast_data():
+    """Return the saved Open-Meteo response, parsed anew for each test."""
+    path = pathlib.Path(__file__).with_name("forecast.txt")
+    return ast.literal_eval(path.read_text(encoding="utf8"))
+
 def pytest_sessionstart(session):  # pylint: disable=unused-argument
     """Run code before collection and run test loop."""
     print_saved_forecast()
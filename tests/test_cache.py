@@ -0,0 +1,150 @@
+"""Test persistent cache."""
+
+import threading
+import time
+from unittest.mock import ANY, Mock, patch
+import pytest
+from weathercat.cache import FileCache, render_key
+from weathercat.geolocation import georesolve
+from weathercat.providers import Forecast
+from weathercat.providers import open_meteo
+
+def test_file_cache(cache_directory):
+    """Test expiry and eviction."""
+    cache = FileCache("test", max_entries=2)
+    assert cache.get("a") is None
+    cache.set("a", {"value": 1})
+    cache.set(["b", 2.0], [1, 2], expires=time.time() - 1)
+    assert cache.get("a") == {"value": 1}
+    assert cache.get(["b", 2.0]) is None
+    assert cache.get(["b", 2.0], stale=True) == [1, 2]
+    cache.set("c", "ä")
+    assert cache.get("c") == "ä"
+    assert len(list((cache_directory / "test").glob("*.json"))) == 2
+    assert not list((cache_directory / "test").glob("*.tmp"))
+
+def test_forecast_cache(forecast_data):
+    """Test that a cached forecast skips the network."""
+    forecast = open_meteo.transform(forecast_data)
+    with patch("requests.Session.get") as get:
+        get.return_value.json.return_value = forecast_data
+        assert open_meteo.get_forecast(61.0007, 24.4791).to_dict() == (
+            Forecast(forecast).to_dict())
+        assert open_meteo.get_forecast(61.0012, 24.4789).to_dict() == (
+            Forecast(forecast).to_dict())
+        assert get.call_count == 1
+        open_meteo.get_forecast(61.0007, 24.4791, ttl=0)
+        assert get.call_count == 2
+    assert open_meteo.expiry(10**9) <= time.time() + 3600
+
+def test_current_refresh(forecast_data):
+    """Test that stale current conditions are requested on their own."""
+    with patch("requests.Session.get") as get:
+        get.return_value.json.return_value = forecast_data
+        forecast = open_meteo.get_forecast(61.0, 24.5)
+        assert get.call_count == 1
+        payload = open_meteo.current_payload(
+            open_meteo.build_payload(61.0, 24.5))
+        FileCache("current").set(payload, forecast.current,
+                                 expires=time.time() - 1)
+        open_meteo.loaded.clear()
+        current = {**forecast.current, "time": forecast.current["time"][:-2]
+                   + "45", "temperature": -5.0}
+        get.return_value.json.return_value = {"current_weather": current}
+        refreshed = open_meteo.get_forecast(61.0, 24.5)
+        assert get.call_count == 2
+        assert "hourly" not in get.call_args.kwargs["params"]
+        FileCache("current").set(payload, current, expires=time.time() - 1)
+        open_meteo.loaded.clear()
+        get.side_effect = ConnectionError
+        assert open_meteo.get_forecast(61.0, 24.5).current == (
+            forecast.current)
+    assert refreshed.current["temperature"] == -5.0
+    assert refreshed.hourly.to_dict() == forecast.hourly.to_dict()
+
+def test_render_key(monkeypatch, forecast_data):
+    """Test that renderings are keyed by the version and renderer files."""
+    forecast = Forecast(open_meteo.transform(forecast_data))
+    terminal = {"width": 80, "is_terminal": False, "color_system": None}
+    key = render_key(forecast, "Hölmölä", terminal)
+    assert render_key(forecast, "Hölmölä", terminal) == key
+    monkeypatch.setattr("weathercat.cache.rendering.RENDERER_FILES",
+                        ["formats/formats.py"])
+    assert render_key(forecast, "Hölmölä", terminal) != key
+    monkeypatch.setattr("weathercat.cache.rendering.__version__", "0")
+    assert render_key(forecast, "Hölmölä", terminal)[-2] == "0"
+
+def test_geocoding_cache():
+    """Test forward and reverse geocoding caches and offline mode."""
+    raw = {"name": "Hämeenlinna", "addresstype": "city",
+           "address": {"city": "Hämeenlinna", "country": "Suomi"}}
+    response = Mock(raw=raw, latitude=61.0, longitude=24.46)
+    with patch("weathercat.geolocation.geolocation.nominatim") as nominatim:
+        nominatim.return_value.geocode.return_value = response
+        nominatim.return_value.reverse.return_value = response
+        expected = ("Hämeenlinna, Suomi", 61.0, 24.46)
+        assert georesolve("Hämeenlinna") == expected
+        assert georesolve("  hämeenlinna ", offline=True) == expected
+        assert georesolve("61.0, 24.46")[0] == "Hämeenlinna, Suomi"
+        assert georesolve("61.001, 24.458", offline=True) == (
+            "Hämeenlinna, Suomi", 61.001, 24.458)
+        assert nominatim.return_value.geocode.call_count == 1
+        assert nominatim.return_value.reverse.call_count == 1
+    with pytest.raises(LookupError):
+        georesolve("Hölmölä", offline=True)
+
+def test_signed_geocoding_keys():
+    """Test that reverse geocoding keys keep the signs of coordinates."""
+    raw = {"name": "Sydney", "addresstype": "city",
+           "address": {"city": "Sydney", "country": "Australia"}}
+    with patch("weathercat.geolocation.geolocation.nominatim") as nominatim:
+        nominatim.return_value.reverse.return_value = Mock(
+            raw=raw, latitude=-33.87, longitude=151.21)
+        assert georesolve("-33.87, 151.21")[0] == "Sydney, Australia"
+        nominatim.return_value.reverse.assert_called_with(
+            (-33.87, 151.21), language=ANY, addressdetails=True)
+    assert georesolve("-33.87 151.21", offline=True)[0] == (
+        "Sydney, Australia")
+    assert georesolve("33.87, 151.21", offline=True)[0] == (
+        "Reverse geocoding unavailable")
+    assert georesolve("-33.87, -151.21", offline=True)[0] == (
+        "Reverse geocoding unavailable")
+
+def test_single_flight(forecast_data):
+    """Test that concurrent cache misses cause a single request."""
+    def slow_response(*_args, **_kwargs):
+        time.sleep(0.2)
+        return Mock(json=lambda: forecast_data)
+    with patch("requests.Session.get", side_effect=slow_response) as get:
+        threads = [threading.Thread(target=open_meteo.get_forecast,
+                                    args=(61.0, 24.5)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert get.call_count == 1
+    cache = FileCache("test")
+    with cache.lock("a") as locked:
+        assert locked
+        start = time.monotonic()
+        with cache.lock("a", timeout=0.1) as locked_again:
+            assert not locked_again
+        assert time.monotonic() - start < 1
+
+def test_bulk_forecasts(forecast_data):
+    """Test that cache misses are requested in bulk."""
+    coordinates = [(60 + i/10, 25) for i in range(120)]
+    def bulk_response(*_args, params, **_kwargs):
+        latitudes = params.split("&")[0].split("=")[1].split(",")
+        return Mock(json=lambda: [{**forecast_data, "latitude": float(x)}
+                                  for x in latitudes])
+    with patch("requests.Session.get", side_effect=bulk_response) as get:
+        open_meteo.get_forecasts(coordinates[:10])
+        forecasts = open_meteo.get_forecasts(coordinates)
+        assert get.call_count == 1 + 3
+    assert [x.latitude for x in forecasts] == [round(ϕ, 2)
+                                                   for ϕ, _λ in coordinates]
+    with (patch("requests.Session.get",
+                return_value=Mock(json=lambda: [forecast_data])),
+          pytest.raises(ConnectionError)):
+        open_meteo.get_forecasts([(50.0, 25), (50.1, 25)])
@@ -0,0 +1,57 @@
+"""Test the daemon and its thin client."""
+
+import io
+import threading
+from unittest.mock import Mock, patch
+import pytest
+from weathercat.client import main, query
+from weathercat.daemon import Server
+from weathercat.protocol import socket_path
+from weathercat.script import main as script_main, run
+
+def test_daemon(monkeypatch, tmp_path, forecast_data):
+    """Test rendering through the socket."""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    conf = {"default_location": {"name": "Hölmölä", "latitude": 61.42,
+                                 "longitude": 29.03}}
+    server = Server(socket_path(), conf, run)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with patch("requests.Session.get",
+                   return_value=Mock(json=lambda: forecast_data)) as get:
+            status, output = query([])
+            assert (status, get.call_count) == (0, 1)
+            assert "Hölmölä" in output and "\x1b[" not in output
+            streamed = io.StringIO()
+            assert query([], streamed) == (0, output)
+            assert streamed.getvalue() == output
+            assert get.call_count == 1
+        assert query(["--offline", "Nowhere"])[0] == 1
+        status, output = query(["--days", "many"])
+        assert status == 2 and "invalid int value" in output
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_local_options(monkeypatch):
+    """Test that profiling runs in the client's own process."""
+    monkeypatch.setattr("sys.argv", ["weathercat-client", "--profile=json"])
+    with (patch("weathercat.client.query") as query_,
+          patch("weathercat.script.main") as fallback):
+        main()
+    assert not query_.called and fallback.called
+
+def test_second_daemon(monkeypatch, tmp_path, capsys):
+    """Test that a second daemon exits with a message."""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    monkeypatch.setattr("sys.argv", ["weathercat", "--daemon"])
+    server = Server(socket_path(), {}, run)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with (patch("weathercat.script.setup_logging"),
+              pytest.raises(SystemExit)):
+            script_main()
+        assert "already listening" in capsys.readouterr().out
+    finally:
+        server.shutdown()
+        server.server_close()
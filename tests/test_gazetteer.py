@@ -0,0 +1,96 @@
+"""Test the offline gazetteer."""
+
+import time
+from unittest.mock import patch
+import geopy
+import pytest
+from weathercat.geolocation import georesolve
+from weathercat.geolocation import gazetteer as gazetteer_module
+from weathercat.geolocation.gazetteer import (open_gazetteer, read_dump,
+                                              write_gazetteer)
+
+# name, asciiname, alternate names, latitude, longitude, country, admin1,
+# population
+PLACES = [
+    ("Hämeenlinna", "Hameenlinna", "Tavastehus", 60.99596, 24.46434, "FI",
+     "06", 67532),
+    ("Helsinki", "Helsinki", "Helsingfors", 60.16952, 24.93545, "FI", "01",
+     558457),
+    ("Hamina", "Hamina", "Fredrikshamn", 60.56974, 27.19794, "FI", "13",
+     20756),
+    ("Paris", "Paris", "", 48.85341, 2.3488, "FR", "11", 2138551),
+    ("Paris", "Paris", "", 33.66094, -95.55551, "US", "TX", 24782),
+    ("Suva", "Suva", "", -18.14161, 178.44149, "FJ", "R", 77366),
+    ("Apia", "Apia", "", -13.83333, -171.76666, "WS", "24", 40407),
+]
+
+@pytest.fixture(name="gazetteer")
+def fixture_gazetteer(tmp_path):
+    """Build a gazetteer from a small GeoNames-style dump."""
+    dump = tmp_path / "cities.txt"
+    dump.write_text("".join(
+        "\t".join(["0", name, ascii_name, alternate, str(ϕ), str(λ), "P",
+                   "PPLA", country, "", admin1, "", "", "", str(population),
+                   "", "", "Europe/Helsinki", "2023-01-01"]) + "\n"
+        for name, ascii_name, alternate, ϕ, λ, country, admin1, population
+        in PLACES), encoding="utf8")
+    admin1 = tmp_path / "admin1.txt"
+    admin1.write_text("FI.06\tKanta-Häme\tKanta-Hame\t1\n"
+                      "FI.01\tUusimaa\tUusimaa\t2\n"
+                      "FI.13\tKymenlaakso\tKymenlaakso\t3\n"
+                      "FR.11\tÎle-de-France\tIle-de-France\t4\n"
+                      "US.TX\tTexas\tTexas\t5\n", encoding="utf8")
+    countries = tmp_path / "countries.txt"
+    countries.write_text("#ISO\tISO3\tnumeric\tfips\tCountry\n"
+                         "FI\tFIN\t246\tFI\tFinland\n"
+                         "FR\tFRA\t250\tFR\tFrance\n"
+                         "US\tUSA\t840\tUS\tUnited States\n", encoding="utf8")
+    path = gazetteer_module.gazetteer_file()  # isolated by cache_directory
+    path.parent.mkdir(parents=True)
+    write_gazetteer(read_dump(dump, admin1, countries, alternate_names=True),
+                    path)
+    return open_gazetteer()
+
+def test_forward(gazetteer):
+    """Test exact, folded, prefix, alternate and qualified names."""
+    assert gazetteer.forward("Hämeenlinna")[0] == (
+        "Hämeenlinna, Kanta-Häme, Finland")
+    assert gazetteer.forward("  HAMEENLINNA ")[0].startswith("Hämeenlinna")
+    assert gazetteer.forward("tavastehus")[0].startswith("Hämeenlinna")
+    assert gazetteer.forward("Hami")[0].startswith("Hamina")
+    assert gazetteer.forward("Paris")[0] == "Paris, Île-de-France, France"
+    assert gazetteer.forward("Paris, Texas")[0] == (
+        "Paris, Texas, United States")
+    assert gazetteer.forward("Paris, Suomi") is None
+    assert gazetteer.forward("Hölmölä") is None
+
+def test_reverse(gazetteer):
+    """Test nearest places, also across the antimeridian and at sea."""
+    assert gazetteer.reverse(61.0, 24.46).startswith("Hämeenlinna")
+    assert gazetteer.reverse(60.2, 25.0).startswith("Helsinki")
+    assert gazetteer.reverse(-17.5, 179.0) == "Suva, FJ"
+    assert gazetteer.reverse(-18.1, -179.9) == "Suva, FJ"
+    assert gazetteer.reverse(-13.9, -179.0) is None
+    start = time.perf_counter()
+    for i in range(1000):
+        gazetteer.reverse(60 + i/1000, 25)
+        gazetteer.forward("Hämeenlinna")
+    assert time.perf_counter() - start < 1
+
+def test_georesolve(gazetteer):  # pylint: disable=unused-argument
+    """Test offline and fallback resolution with the gazetteer."""
+    assert georesolve("Helsinki", offline=True) == (
+        "Helsinki, Uusimaa, Finland", pytest.approx(60.16952),
+        pytest.approx(24.93545))
+    assert georesolve("61.0, 24.46", offline=True)[0].startswith(
+        "Hämeenlinna")
+    assert georesolve("-13.9, -179.0", offline=True)[0] == (
+        "Reverse geocoding unavailable")
+    with patch("weathercat.geolocation.geolocation.nominatim") as nominatim:
+        nominatim.return_value.geocode.side_effect = (
+            geopy.exc.GeocoderUnavailable)
+        assert georesolve("Hamina")[0].startswith("Hamina")
+        with pytest.raises(ConnectionError):
+            georesolve("Hamina", gazetteer="off")
+        assert georesolve("Paris", gazetteer="prefer")[0].startswith("Paris")
+        assert nominatim.return_value.geocode.call_count == 2
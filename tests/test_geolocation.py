@@ -0,0 +1,38 @@
+"""Test autolocation."""
+
+import time
+from unittest.mock import patch
+from weathercat.geolocation import geolocate
+
+MODULE = "weathercat.geolocation.geolocation"
+
+def test_race():
+    """Test that an accurate Geoclue fix wins over a fast IP fix."""
+    def geoclue_locate():
+        time.sleep(0.2)
+        return 61.0, 24.5, 100
+    with (patch(f"{MODULE}.import_geoclue", return_value=object()),
+          patch(f"{MODULE}.geoclue_locate", geoclue_locate),
+          patch(f"{MODULE}.ip_locate", return_value=(60.2, 24.9, 25000))):
+        assert geolocate() == (61.0, 24.5)
+
+def test_hung_geoclue():
+    """Test that a hung Geoclue query delays an IP fix only briefly."""
+    with (patch(f"{MODULE}.import_geoclue", return_value=object()),
+          patch(f"{MODULE}.geoclue_locate", lambda: time.sleep(60)),
+          patch(f"{MODULE}.ip_locate", return_value=(60.2, 24.9, 25000)),
+          patch(f"{MODULE}.ACCURACY_GRACE", 0.1)):
+        start = time.monotonic()
+        assert geolocate() == (60.2, 24.9)
+        assert time.monotonic() - start < 1
+
+def test_cached_fix():
+    """Test reuse of the last fix."""
+    with (patch(f"{MODULE}.import_geoclue", return_value=None),
+          patch(f"{MODULE}.ip_locate",
+                return_value=(60.2, 24.9, 25000)) as ip_locate):
+        assert geolocate() == (60.2, 24.9)
+        assert geolocate() == (60.2, 24.9)
+        assert ip_locate.call_count == 1
+        assert geolocate(max_age=0) == (60.2, 24.9)
+        assert ip_locate.call_count == 2
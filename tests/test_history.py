@@ -0,0 +1,55 @@
+"""Test the forecast history."""
+
+import pytest
+from weathercat import history
+from weathercat.history import HistoryStore
+from weathercat.history.query import evolution, nearest_location, statistics
+from weathercat.providers import get_forecast
+from weathercat.providers.standin import start
+
+def shifted(data, shift):
+    """Return a forecast response with shifted temperatures."""
+    return {**data, "hourly": {**data["hourly"], "temperature_2m": [
+        x + shift for x in data["hourly"]["temperature_2m"]]}}
+
+def test_store(tmp_path, forecast_data):
+    """Test appends, deduplication, torn rows and queries."""
+    store = HistoryStore(tmp_path)
+    issued = 1688824800  # 2023-07-08T14:00Z
+    store.append(61.0, 24.5, forecast_data, issued)
+    store.append(61.0, 24.5, forecast_data, issued + 60)  # same issue
+    assert store.rows("hourly") == 168 and store.rows("daily") == 7
+    with open(store.column_path("hourly", "issued", "q"), "ab") as torn:
+        torn.write(b"\0\0\0")
+    assert store.rows("hourly") == 168
+    store.append(61.0, 24.5, shifted(forecast_data, 1.0), issued + 3600)
+    store.append(60.2, 24.9, shifted(forecast_data, 5.0), issued + 3600)
+    assert store.rows("hourly") == 3*168
+    assert nearest_location(store, 60.3, 25.0) == 1
+    valid = 1688943600  # 2023-07-10T02:00+03:00
+    temperatures = forecast_data["hourly"]["temperature_2m"]
+    i = forecast_data["hourly"]["time"].index("2023-07-10T02:00")
+    assert evolution(store, 0, "temperature_2m", valid) == [
+        (issued, pytest.approx(temperatures[i], abs=1e-4)),
+        (issued + 3600, pytest.approx(temperatures[i] + 1, abs=1e-4))]
+    stats = statistics(store, 0, "temperature_2m", valid - 86400, valid)
+    assert stats["count"] == 25
+    assert stats["max"] == pytest.approx(max(temperatures[i - 24:i + 1]) + 1,
+                                         abs=1e-4)
+    with pytest.raises(LookupError):
+        statistics(store, 0, "temperature_2m", 0, 1)
+
+def test_recording(monkeypatch, tmp_path):
+    """Test that only fetched forecasts are recorded."""
+    monkeypatch.setattr(history.store, "active", None)
+    server = start()
+    try:
+        get_forecast(61.0, 24.5, base_url=server.base_url)
+        store = history.start(tmp_path)
+        get_forecast(61.0, 24.5, base_url=server.base_url)
+        assert not store.locations()
+        get_forecast(60.2, 24.9, days=2, base_url=server.base_url)
+    finally:
+        server.shutdown()
+    assert [x[:2] for x in store.locations()] == [[60.2, 24.9]]
+    assert store.rows("daily") == 2
@@ -0,0 +1,56 @@
+"""Test lunar phases."""
+
+import random
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+import platformdirs
+import pytest
+from weathercat.output import (approximate_full_moons, fabricate_moon_function,
+                               load_full_moons)
+
+def test_full_moon_table():
+    """Test full moon lookups against known dates."""
+    moon = fabricate_moon_function()
+    assert moon("2023-08-01", "Europe/Helsinki") == "🌕"
+    assert moon("2023-08-31", "Europe/Helsinki") == "🌕"
+    assert moon("2023-08-30", "America/New_York") == "🌕"
+    assert moon("2023-08-31", "America/New_York") == ""
+    assert moon("2023-08-15", "Europe/Helsinki") == ""
+
+def test_full_moon_table_against_skyfield():
+    """Test that the table agrees with per-day skyfield root finding."""
+    pytest.importorskip("skyfield")
+    from skyfield import api, almanac  # pylint: disable=import-outside-toplevel
+    file = platformdirs.user_data_path("weathercat") / "de421.bsp"
+    if not file.is_file():
+        pytest.skip("DE421 ephemeris is not available")
+    timescale = api.load.timescale()
+    phases = almanac.moon_phases(api.load_file(file))
+    def skyfield_moon(day, timezone):
+        dt0 = datetime.combine(day, time.min, ZoneInfo(timezone))
+        dt1 = datetime.combine(day, time.max, ZoneInfo(timezone))
+        _times, found = almanac.find_discrete(timescale.from_datetime(dt0),
+                                              timescale.from_datetime(dt1),
+                                              phases)
+        return "🌕" if 2 in found else ""  # 2 = Full Moon
+    moon = fabricate_moon_function()
+    _coverage, full_moons = load_full_moons()
+    random.seed(0)
+    days = [date(2000, 1, 2) + timedelta(days=random.randrange(18200))
+            for _ in range(50)]
+    for full_moon in random.sample(full_moons, 50):
+        day = datetime.fromtimestamp(full_moon, ZoneInfo("UTC")).date()
+        days.extend([day - timedelta(days=1), day, day + timedelta(days=1)])
+    for day in days:
+        timezone = random.choice(["UTC", "Europe/Helsinki", "Asia/Tokyo",
+                                  "America/Los_Angeles"])
+        assert moon(day.isoformat(), timezone) == skyfield_moon(day, timezone)
+
+def test_approximate_full_moons():
+    """Test Meeus' approximation against the precomputed table."""
+    (first, last), full_moons = load_full_moons()
+    approximations = approximate_full_moons(
+        datetime.fromtimestamp(first, ZoneInfo("UTC")),
+        datetime.fromtimestamp(last, ZoneInfo("UTC")))
+    assert len(approximations) == len(full_moons)
+    assert all(abs(x - y) < 30 for x, y in zip(approximations, full_moons))
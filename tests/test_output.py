@@ -1,15 +1,21 @@
 """Test output."""
 
 import ast
+import io
 import pkgutil
-from weathercat.output import output, represent_temperature
+from rich.cells import cell_len
+from weathercat.output import (classify_wind, classify_ww, forecast_rows,
+                               forecast_widths, output, render,
+                               represent_temperature, represent_ww)
+from weathercat.providers import Forecast
 from weathercat.providers.open_meteo import transform
+from weathercat.terminal import describe_terminal
 
 def print_saved_forecast():
     """Test output with offline data."""
     data = pkgutil.get_data(__name__, "forecast.txt")
     forecast = ast.literal_eval(data.decode("utf8"))
-    forecast = transform(forecast)
+    forecast = Forecast(transform(forecast))
     output(forecast, "Hölmölä, Suomi")
 
 def test_temperature():
@@ -18,3 +24,63 @@ def test_temperature():
     assert "feels_like_warmer" not in represent_temperature(0, 1)
     assert "feels_like_colder" in represent_temperature(0, -5)
     assert "feels_like_colder" not in represent_temperature(0, -4)
+
+def test_render_backends(forecast_data):
+    """Test that styled text renders identically to console markup."""
+    forecast = Forecast(transform(forecast_data))
+    for width in [60, 100]:
+        terminal = {"width": width, "is_terminal": True,
+                    "color_system": "truecolor"}
+        assert (render(forecast, "Hölmölä, Suomi", terminal,
+                       {"backend": "text"})
+                == render(forecast, "Hölmölä, Suomi", terminal,
+                          {"backend": "markup"}))
+    streamed = io.StringIO()
+    assert render(forecast, "Hölmölä", terminal, file=streamed) == (
+        streamed.getvalue())
+
+def test_no_color(monkeypatch, forecast_data):
+    """Test that NO_COLOR keeps non-color styles and bad COLUMNS is ignored."""
+    monkeypatch.setenv("NO_COLOR", "1")
+    monkeypatch.setenv("COLUMNS", "abc")
+    monkeypatch.setenv("FORCE_COLOR", "1")
+    monkeypatch.setenv("TERM", "xterm-256color")
+    monkeypatch.delenv("COLORTERM", raising=False)
+    terminal = describe_terminal()
+    assert terminal["no_color"] and terminal["color_system"] == "256"
+    assert terminal["width"] > 0
+    rendered = render(Forecast(transform(forecast_data)), "Hölmölä",
+                      terminal)
+    assert "\x1b[7m" in rendered  # reverse condition bar
+    assert "\x1b[3" not in rendered and "\x1b[9" not in rendered
+
+def test_forecast_widths(forecast_data):
+    """Test that column widths match the widest cells of the rows."""
+    forecast = Forecast(transform(forecast_data))
+    widths = [0]*7
+    for row in forecast_rows(forecast):
+        for i, pieces in enumerate(row):
+            widths[i] = max(widths[i], cell_len("".join(
+                string for string, *_styles in pieces)))
+    assert forecast_widths(forecast) == widths
+
+def test_classification():
+    """Test weather code and wind classification tables."""
+    assert represent_ww(3) == ("☁️ ", "overcast")
+    assert represent_ww(4) == represent_ww(-1) == represent_ww(100)
+    assert classify_ww([0, 99, -1, 150]) == [represent_ww(0), represent_ww(99),
+                                             represent_ww(-1), represent_ww(150)]
+    assert classify_wind([0, 3.4, 3.5, 7.5, 13.5, 20.4, 20.5]) == "  ⣀⣤⣶⣶⣿"
+
+def test_resolutions(forecast_data):
+    """Test the horizon and resolution of rendered forecasts."""
+    terminal = {"width": 100, "is_terminal": False, "color_system": None}
+    two_days = {**forecast_data, "daily": {
+        name: values[:2] for name, values in forecast_data["daily"].items()}}
+    rendered = render(Forecast(transform(two_days)), "Hölmölä, Suomi",
+                      terminal)
+    assert len(rendered.splitlines()) == 7  # details taller than two days
+    rendered = render(Forecast(transform(forecast_data)), "Hölmölä",
+                      terminal, {"resolution": "hourly"})
+    assert " 19:00 " in rendered and "Sun " in rendered
+    assert " 18:00 " not in rendered.split("Sun ", maxsplit=1)[0]  # from now on
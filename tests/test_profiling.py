@@ -0,0 +1,27 @@
+"""Test timing instrumentation."""
+
+from weathercat import profiling
+from weathercat.cache import FileCache
+from weathercat.profiling import span
+
+def test_profile():
+    """Test spans and cache counters of an active profile."""
+    with span("inactive"):
+        pass
+    profile = profiling.start()
+    try:
+        with span("outer"):
+            with span("inner"):
+                cache = FileCache("test")
+                cache.get("key")
+                cache.set("key", 1)
+                cache.get("key")
+    finally:
+        assert profiling.stop() is profile
+    with span("stopped"):
+        pass
+    data = profile.to_dict()
+    assert [(x["name"], x["depth"]) for x in data["spans"]] == [("outer", 0),
+                                                                ("inner", 1)]
+    assert data["counters"] == {"cache.test.hit": 1, "cache.test.miss": 1}
+    assert "inner" in profile.report()
@@ -0,0 +1,70 @@
+"""Test weather providers."""
+
+import pkgutil
+import socket
+from statistics import mean
+import pytest
+from weathercat.geolocation.geolocation import nominatim
+from weathercat.network import get_session, rank_mirrors
+from weathercat.providers import get_forecast, get_forecasts
+from weathercat.providers.open_meteo import transform
+from weathercat.providers.standin import start
+
+def test_transform(forecast_data):
+    """Test daily weathercode replacement without mutating the input."""
+    daily_codes = list(forecast_data["daily"]["weathercode"])
+    result = transform(forecast_data)
+    assert forecast_data["daily"]["weathercode"] == daily_codes
+    hourly_codes = forecast_data["hourly"]["weathercode"]
+    for day, code in enumerate(daily_codes):
+        day_codes = hourly_codes[day*24:(day + 1)*24]
+        expected = code if code > 3 else round(mean(day_codes))
+        assert result["daily"]["weathercode"][day] == expected
+    assert result["hourly"] == forecast_data["hourly"]
+
+def test_shared_session():
+    """Test that providers and geocoders share one pooled session."""
+    session = get_session()
+    assert session is get_session()
+    assert nominatim().adapter.session is session
+    assert session.get_adapter("https://").max_retries.total == 3
+
+def test_standin():
+    """Test bulk requests to the stand-in server through the registry."""
+    server = start()
+    try:
+        forecasts = get_forecasts([(61.0, 24.5), (60.2, 24.9)], days=3,
+                                  minutely=True, base_url=server.base_url)
+    finally:
+        server.shutdown()
+    assert [(x.latitude, x.longitude) for x in forecasts] == [(61.0, 24.5),
+                                                             (60.2, 24.9)]
+    assert [len(forecasts[0].daily), len(forecasts[0].hourly),
+            len(forecasts[0].minutely)] == [3, 72, 288]
+    assert forecasts[0].current_hour() >= 0
+
+def test_mirrors():
+    """Test that an unreachable mirror is skipped."""
+    server = start()
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        dead_url = f"http://127.0.0.1:{unused.getsockname()[1]}/v1/forecast"
+    try:
+        assert rank_mirrors([dead_url, server.base_url]) == [server.base_url,
+                                                             dead_url]
+        assert get_forecast(61.0, 24.5, ttl=0, base_url=dead_url,
+                            mirrors=[server.base_url]).latitude == 61.0
+    finally:
+        server.shutdown()
+
+def test_snapshot(tmp_path):
+    """Test the file provider."""
+    path = tmp_path / "forecast.txt"
+    path.write_bytes(pkgutil.get_data(__name__, "forecast.txt"))
+    forecasts = get_forecasts([(0, 0), (1, 1)], "file", path=str(path),
+                              days=2, ttl=60)
+    assert len(forecasts[1].daily) == 2 and len(forecasts[1].hourly) == 48
+    with pytest.raises(LookupError):
+        get_forecast(0, 0, "no-such-provider")
+    with pytest.raises(LookupError):
+        get_forecasts([(0, 0)], "file")
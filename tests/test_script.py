@@ -0,0 +1,68 @@
+"""Test the main pipeline."""
+
+import subprocess
+import sys
+import time
+from unittest.mock import Mock, patch
+from weathercat.config import parse_arguments
+from weathercat.output import render
+from weathercat.script import fetch_concurrently, run
+
+def test_fetch_concurrently():
+    """Test that jobs overlap and reverse geocoding failures degrade."""
+    def forecast_job():
+        time.sleep(0.2)
+        return "forecast"
+    def georesolve_job():
+        time.sleep(0.2)
+        return "Hölmölä", 61, 24
+    def failing_job():
+        raise ConnectionError("mocked")
+    start = time.monotonic()
+    assert fetch_concurrently(forecast_job, georesolve_job) == (
+        "forecast", ("Hölmölä", 61, 24))
+    assert time.monotonic() - start < 0.35
+    assert fetch_concurrently(forecast_job, failing_job) == ("forecast", None)
+    assert fetch_concurrently(forecast_job) == ("forecast", None)
+
+def test_hung_job():
+    """Test that a hung job delays neither the result nor exit."""
+    script = ("import time\n"
+              "from unittest.mock import patch\n"
+              "from weathercat.script import fetch_concurrently\n"
+              "with patch('weathercat.script.DEADLINE', 0.5):\n"
+              "    assert fetch_concurrently(lambda: 1, lambda: time.sleep(60))"
+              " == (1, None)\n"
+              "    try:\n"
+              "        fetch_concurrently(lambda: time.sleep(60))\n"
+              "    except ConnectionError:\n"
+              "        pass\n"
+              "    else:\n"
+              "        raise SystemExit('no forecast timeout')\n")
+    start = time.monotonic()
+    subprocess.run([sys.executable, "-c", script], check=True)
+    assert time.monotonic() - start < 5
+
+def test_render_cache(capsys, forecast_data):
+    """Test that a repeated run writes the cached rendering."""
+    args = parse_arguments(["--offline", "61.42", "29.03"])
+    with (patch("requests.Session.get", return_value=Mock(json=lambda: forecast_data)),
+          patch("weathercat.output.render", wraps=render) as render_):
+        run(args, {})
+        first = capsys.readouterr().out
+        run(args, {})
+        assert capsys.readouterr().out == first
+        assert render_.call_count == 1
+    assert "Reverse geocoding" in first
+
+def test_signed_coordinates(capsys, forecast_data):
+    """Test that southern and western coordinates keep their signs."""
+    with patch("requests.Session.get",
+               return_value=Mock(json=lambda: forecast_data)) as get:
+        run(parse_arguments(["-o", "-33.87", "151.21"]), {})
+        assert "latitude=-33.87&longitude=151.21&" in (
+            get.call_args.kwargs["params"])
+        run(parse_arguments(["-o", "geo:40.71,-74.01"]), {})
+        assert "latitude=40.71&longitude=-74.01&" in (
+            get.call_args.kwargs["params"])
+    capsys.readouterr()
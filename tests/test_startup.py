@@ -0,0 +1,40 @@
+"""Test startup imports."""
+
+import os
+import pathlib
+import subprocess
+import sys
+
+def test_lazy_imports():
+    """Test that parsing arguments doesn't import heavy dependencies."""
+    code = ("import sys, weathercat.script\n"
+            "from weathercat.config import parse_arguments, setup_logging\n"
+            "setup_logging(parse_arguments(['61.0', '24.5']).loglevel)\n"
+            "print(*sys.modules)")
+    process = subprocess.run([sys.executable, "-c", code],
+                             capture_output=True, text=True, check=True)
+    modules = process.stdout.split()
+    for module in ["rich", "requests", "geopy", "geocoder", "gi", "skyfield",
+                   "multiprocessing", "importlib.metadata"]:
+        assert module not in modules
+
+def test_machine_formats(tmp_path):
+    """Test that machine-readable output doesn't import rich."""
+    config_directory = tmp_path / "config" / "weathercat"
+    config_directory.mkdir(parents=True)
+    forecast = pathlib.Path(__file__).parent / "forecast.txt"
+    (config_directory / "weathercat.conf").write_text(
+        f'provider.name = "file"\nprovider.path = "{forecast}"\n')
+    code = ("import sys\n"
+            "from weathercat.script import main\n"
+            "sys.argv = ['weathercat', '-o', '-f', 'line',\n"
+            "            '--fields', 'symbol,temperature', '61', '24']\n"
+            "main()\n"
+            "print(*sys.modules, file=sys.stderr)")
+    process = subprocess.run([sys.executable, "-c", code],
+                             capture_output=True, text=True, check=True,
+                             env={**os.environ,
+                                  "XDG_CONFIG_HOME": str(tmp_path / "config"),
+                                  "XDG_CACHE_HOME": str(tmp_path / "cache")})
+    assert process.stdout == "🌤️ 18\n"
+    assert "rich" not in process.stderr.split()
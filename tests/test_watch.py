@@ -0,0 +1,68 @@
+"""Test watch mode."""
+
+import io
+import signal
+import time
+from unittest.mock import patch
+from weathercat.output import output_chunks, render_chunks
+from weathercat.providers import get_current_weather, get_forecast
+from weathercat.providers import Forecast
+from weathercat.providers.open_meteo import transform
+from weathercat.providers.standin import start
+from weathercat.terminal import describe_terminal
+from weathercat.watch import Screen, redraw, watch
+from weathercat.watch.watch import CLEAR_SCREEN, SHOW_CURSOR
+
+def test_redraw():
+    """Test that only changed lines are rewritten."""
+    file = io.StringIO()
+    assert redraw(["a", "b", "c"], ["a", "x"], file) == ["a", "x"]
+    assert file.getvalue() == "\x1b[2;1Hx\x1b[K\x1b[3;1H\x1b[J"
+
+def test_watch():
+    """Test a current conditions refresh merged into a forecast."""
+    server = start()
+    try:
+        forecast = get_forecast(61.0, 24.5, ttl=0, base_url=server.base_url)
+        current = get_current_weather(61.0, 24.5, base_url=server.base_url)
+    finally:
+        server.shutdown()
+    merged = forecast.with_current({**current, "temperature": -40.0})
+    assert merged.hourly is forecast.hourly
+    assert merged.digest != forecast.digest
+    file = io.StringIO()
+    with (patch("weathercat.watch.watch.next_update",
+                lambda now: now + 0.01),
+          patch("weathercat.watch.watch.refresh",
+                side_effect=KeyboardInterrupt)):
+        start_time = time.monotonic()
+        watch(merged, Screen(file, "Hämeenlinna, Suomi"), (61.0, 24.5), {})
+        assert time.monotonic() - start_time < 5
+    output = file.getvalue()
+    assert CLEAR_SCREEN in output and "40" in output
+    assert output.endswith(SHOW_CURSOR)
+
+def test_current_only_redraw(monkeypatch, forecast_data):
+    """Test that a current conditions refresh renders only the first chunk."""
+    monkeypatch.setenv("COLUMNS", "100")
+    forecast = Forecast(transform(forecast_data))
+    refreshed = forecast.with_current({**forecast.current,
+                                       "temperature": -40.0})
+    renderables = []
+    def counting_chunks(*args, **kwargs):
+        for renderable in output_chunks(*args, **kwargs):
+            renderables.append(renderable)
+            yield renderable
+    handler = signal.getsignal(signal.SIGWINCH)
+    file = io.StringIO()
+    with (patch("weathercat.watch.watch.next_update", lambda now: now),
+          patch("weathercat.output.output.output_chunks", counting_chunks),
+          patch("weathercat.watch.watch.refresh",
+                side_effect=[refreshed, KeyboardInterrupt])):
+        watch(forecast, Screen(file, "Hämeenlinna, Suomi"), (61.0, 24.5),
+              {})
+    chunks = len(list(render_chunks(forecast, "Hämeenlinna, Suomi",
+                                    describe_terminal())))
+    assert chunks > 1 and len(renderables) == chunks + 1
+    assert "−40" in file.getvalue()
+    assert signal.getsignal(signal.SIGWINCH) is handler